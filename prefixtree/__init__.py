@@ -1,13 +1,22 @@
 """Trie based implemenation of dict and set.
 
-Provides two collection classes:
+Provides six collection classes:
 
 * PrefixDict, a dictionary like object
 * PrefixSet, a set like object
+* ArenaPrefixDict, a dictionary like object holding its trie in arrays
+* ArenaPrefixSet, a set like object holding its trie in arrays
+* FrozenPrefixDict, an immutable dictionary like object
+* FrozenPrefixSet, an immutable set like object
 
 """
 from prefixtree.version import __version__
 from prefixtree.collections import PrefixDict
 from prefixtree.collections import PrefixSet
+from prefixtree.collections import ArenaPrefixDict
+from prefixtree.collections import ArenaPrefixSet
+from prefixtree.collections import FrozenPrefixDict
+from prefixtree.collections import FrozenPrefixSet
 
-__all__ = ['PrefixDict', 'PrefixSet']
+__all__ = ['PrefixDict', 'PrefixSet', 'ArenaPrefixDict', 'ArenaPrefixSet',
+           'FrozenPrefixDict', 'FrozenPrefixSet']
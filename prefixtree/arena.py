@@ -0,0 +1,387 @@
+"Trie implementation storing nodes in parallel typed arrays"
+from array import array
+
+from prefixtree.trie import TrieBase, char, inside, outside, within
+
+# Node id or value slot marking an absent entry.
+NONE = -1
+
+# Multiplier spreading node ids and branch bytes across the child table.
+GOLDEN = 0x9E3779B97F4A7C15
+MASK = (1 << 64) - 1
+
+# Initial number of bits in the size of the child table.
+TABLE_BITS = 4
+
+
+class ArenaTrie(object):
+    """Base class for collections implemented using a Trie held in arrays.
+
+    Nodes are integer ids into parallel arrays rather than Python objects,
+    so the trie is a handful of large allocations however many keys it
+    holds. For each node _branches holds the byte leading to it, _parents
+    its parent, _firsts its first child and _nexts its next sibling, with
+    siblings kept in byte order.
+
+    Children are found through _table, an open addressing hash table of
+    node ids with linear probing, which is checked against _parents and
+    _branches. _links is the number of ids in the table, which is grown to
+    keep it at most two thirds full, and _shift the shift taking a 64 bit
+    hash to a table index.
+
+    Values are held in the dense list _data. For each node _slots holds the
+    index of its value, or NONE if the node is not a key, and _metas the
+    meta of the key. Node ids and value slots freed by deletes are reused
+    by later inserts. The root is node 0.
+
+    Path compression is not supported.
+    """
+
+    def __init__(self):
+        self._branches = bytearray(1)
+        self._metas = bytearray(1)
+        self._parents = array('i', [NONE])
+        self._firsts = array('i', [NONE])
+        self._nexts = array('i', [NONE])
+        self._slots = array('i', [NONE])
+        self._table = array('i', [NONE]) * (1 << TABLE_BITS)
+        self._shift = 64 - TABLE_BITS
+        self._links = 0
+        self._data = []
+        self._free_nodes = []
+        self._free_slots = []
+        self._values = 0
+
+    def __iter__(self):
+        return self._iter_keys()
+
+    def __len__(self):
+        return self._values
+
+    def __reversed__(self):
+        return self._iter_keys(reverse=True)
+
+    def _add_child(self, node, key):
+        "Create and return a child of node for branch byte key."
+        if self._free_nodes:
+            child = self._free_nodes.pop()
+            self._branches[child] = key
+            self._parents[child] = node
+            self._firsts[child] = NONE
+            self._slots[child] = NONE
+        else:
+            child = len(self._parents)
+            self._branches.append(key)
+            self._metas.append(0)
+            self._parents.append(node)
+            self._firsts.append(NONE)
+            self._nexts.append(NONE)
+            self._slots.append(NONE)
+        branches, nexts = self._branches, self._nexts
+        previous, sibling = NONE, self._firsts[node]
+        while sibling != NONE and branches[sibling] < key:
+            previous, sibling = sibling, nexts[sibling]
+        nexts[child] = sibling
+        if previous == NONE:
+            self._firsts[node] = child
+        else:
+            nexts[previous] = child
+        self._link(child)
+        return child
+
+    def _child_list(self, node, lower=0, upper=255):
+        "Return (key, child) pairs for children from lower to upper."
+        branches, nexts = self._branches, self._nexts
+        children = []
+        child = self._firsts[node]
+        while child != NONE:
+            key = branches[child]
+            if key > upper:
+                break
+            if key >= lower:
+                children.append((key, child))
+            child = nexts[child]
+        return children
+
+    def _clear(self, node):
+        "Remove the key at node, freeing its value slot."
+        slot = self._slots[node]
+        self._data[slot] = None
+        self._free_slots.append(slot)
+        self._slots[node] = NONE
+        self._values -= 1
+
+    def _delete(self, path):
+        "Remove the key for path, raising AttributeError if it is absent."
+        node = self._search(path)
+        if node == NONE or self._slots[node] == NONE:
+            raise AttributeError(path)
+        self._clear(node)
+        firsts, slots = self._firsts, self._slots
+        while node and firsts[node] == NONE and slots[node] == NONE:
+            parent = self._parents[node]
+            self._remove_child(parent, node)
+            node = parent
+
+    def _delete_range(self, start=b'', stop=None):
+        """Remove the keys between start and stop, returning how many.
+
+        The bounds are those used by TrieBase._iter. Children whose keys all
+        lie within the bounds are freed whole, and only the nodes on the
+        boundaries of the range are visited. The visited nodes are then
+        pruned, deepest first.
+        """
+        firsts, nexts, slots = self._firsts, self._nexts, self._slots
+        values = self._values
+        visited = []
+        stack = [(0, b'')]
+        while stack:
+            node, path = stack.pop()
+            visited.append(node)
+            if slots[node] != NONE and within(path, start, stop):
+                self._clear(node)
+            kept = []
+            for key, child in self._child_list(node):
+                branch = path + char(key)
+                if inside(branch, start, stop):
+                    self._free(child)
+                    continue
+                if not outside(branch, start, stop):
+                    stack.append((child, branch))
+                kept.append(child)
+            firsts[node] = kept[0] if kept else NONE
+            for child, sibling in zip(kept, kept[1:] + [NONE]):
+                nexts[child] = sibling
+        for node in reversed(visited):
+            if node and firsts[node] == NONE and slots[node] == NONE:
+                self._remove_child(self._parents[node], node)
+        return values - self._values
+
+    def _find(self, node, key):
+        "Return the child of node for branch byte key, or NONE."
+        table, parents, branches = self._table, self._parents, self._branches
+        mask = len(table) - 1
+        index = ((node << 8 | key) * GOLDEN & MASK) >> self._shift
+        while True:
+            child = table[index]
+            if child == NONE or (parents[child] == node and
+                                 branches[child] == key):
+                return child
+            index = (index + 1) & mask
+
+    def _free(self, node):
+        """Free node and every node below it, removing their keys.
+
+        The caller must unlink node from the children of its parent.
+        """
+        firsts, nexts, slots = self._firsts, self._nexts, self._slots
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if slots[node] != NONE:
+                self._clear(node)
+            child = firsts[node]
+            while child != NONE:
+                stack.append(child)
+                child = nexts[child]
+            self._unlink(node)
+            self._free_nodes.append(node)
+
+    def _home(self, child):
+        "Return the index in _table where the search for child starts."
+        code = self._parents[child] << 8 | self._branches[child]
+        return (code * GOLDEN & MASK) >> self._shift
+
+    def _insert(self, path):
+        """Return the node for path, creating any missing nodes.
+
+        Once a node is created the rest of path is added below it without
+        searching, as a new node has no children.
+        """
+        find = self._find
+        node = 0
+        for depth, key in enumerate(path):
+            child = find(node, key)
+            if child == NONE:
+                for key in path[depth:]:
+                    node = self._add_child(node, key)
+                return node
+            node = child
+        return node
+
+    def _iter(self, start=b'', stop=None, reverse=False):
+        """Iterate over (path, node) pairs within the start and stop bounds.
+
+        The bounds are those used by TrieBase._iter. The path is a buffer
+        shared by the whole traversal, copy it before advancing the iterator
+        if it needs to be kept.
+        """
+        path = bytearray()
+        stack = [(0, NONE, 0, bool(start), bool(stop))]
+        branches = self._branches
+        while stack:
+            depth, emit, node, low, high = stack.pop()
+            del path[depth:]
+            if emit != NONE:
+                yield path, node
+                continue
+            if node:
+                path.append(branches[node])
+                depth += 1
+            if low and depth >= len(start):
+                low = False
+            if high and depth >= len(stop):
+                high = False
+            if not low:
+                if not reverse:
+                    yield path, node
+                else:
+                    stack.append((depth, node, node, False, False))
+            lower = start[depth] if low else 0
+            upper = stop[depth] if high else 255
+            children = self._child_list(node, lower, upper)
+            if not reverse:
+                children.reverse()
+            for key, child in children:
+                stack.append((depth, NONE, child,
+                              low and key == lower, high and key == upper))
+
+    def _iter_keys(self, start=b'', stop=None, reverse=False):
+        slots, metas = self._slots, self._metas
+        for path, node in self._iter(start, stop, reverse):
+            if slots[node] != NONE:
+                yield self.restore_key(bytes(path), metas[node])
+
+    def _iter_values(self, start=b'', stop=None, reverse=False):
+        slots, data = self._slots, self._data
+        for _, node in self._iter(start, stop, reverse):
+            slot = slots[node]
+            if slot != NONE:
+                yield data[slot]
+
+    def _link(self, child):
+        "Add child to _table, growing the table if it is too full."
+        if (self._links + 1) * 3 > len(self._table) * 2:
+            table = self._table
+            self._table = array('i', [NONE]) * (len(table) * 2)
+            self._shift -= 1
+            for linked in table:
+                if linked != NONE:
+                    self._place(linked)
+        self._place(child)
+        self._links += 1
+
+    def _match(self, path):
+        """Find the deepest node whose key is a prefix of path.
+
+        Returns the node and the length of its key.
+        """
+        find = self._find
+        node = 0
+        for depth, key in enumerate(path):
+            child = find(node, key)
+            if child == NONE:
+                return node, depth
+            node = child
+        return node, len(path)
+
+    def _place(self, child):
+        "Store child in the first free entry of _table from its home."
+        table = self._table
+        mask = len(table) - 1
+        code = self._parents[child] << 8 | self._branches[child]
+        index = (code * GOLDEN & MASK) >> self._shift
+        while table[index] != NONE:
+            index = (index + 1) & mask
+        table[index] = child
+
+    def _remove_child(self, node, child):
+        "Unlink child from node and free its id."
+        nexts = self._nexts
+        sibling = self._firsts[node]
+        if sibling == child:
+            self._firsts[node] = nexts[child]
+        else:
+            while nexts[sibling] != child:
+                sibling = nexts[sibling]
+            nexts[sibling] = nexts[child]
+        self._unlink(child)
+        self._free_nodes.append(child)
+
+    def _search(self, path):
+        """Return the node for path, or NONE if there is no such node.
+
+        The probing of _find is inlined, as this is the path of every lookup.
+        """
+        table, parents, branches = self._table, self._parents, self._branches
+        mask, shift = len(table) - 1, self._shift
+        node = 0
+        for key in path:
+            index = ((node << 8 | key) * GOLDEN & MASK) >> shift
+            while True:
+                child = table[index]
+                if child == NONE:
+                    return NONE
+                if parents[child] == node and branches[child] == key:
+                    break
+                index = (index + 1) & mask
+            node = child
+        return node
+
+    def _set(self, node, value, meta):
+        "Store value and meta for the key at node."
+        slot = self._slots[node]
+        if slot == NONE:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+                self._data[slot] = value
+            else:
+                slot = len(self._data)
+                self._data.append(value)
+            self._slots[node] = slot
+            self._values += 1
+        else:
+            self._data[slot] = value
+        self._metas[node] = meta
+
+    def _unlink(self, child):
+        """Remove child from _table.
+
+        Later entries of the probe run are shifted back into the gap when
+        their home is not after it, so no deleted markers are needed.
+        """
+        table = self._table
+        mask = len(table) - 1
+        index = self._home(child)
+        while table[index] != child:
+            index = (index + 1) & mask
+        table[index] = NONE
+        following = index
+        while True:
+            following = (following + 1) & mask
+            moved = table[following]
+            if moved == NONE:
+                break
+            distance = (following - self._home(moved)) & mask
+            if distance >= (following - index) & mask:
+                table[index] = moved
+                table[following] = NONE
+                index = following
+        self._links -= 1
+
+    prepare_key = TrieBase.prepare_key
+
+    restore_key = TrieBase.restore_key
+
+    def commonprefix(self, key, restore_key=True):
+        "Return longest common prefix between key and current keys."
+        path, _ = self.prepare_key(key)
+        node, depth = self._match(path)
+        if restore_key and self._slots[node] != NONE:
+            return self.restore_key(path[:depth], self._metas[node])
+        return path[:depth]
+
+    def startswith(self, base, reverse=False):
+        "Iterate over all keys with matching prefix."
+        path, _ = self.prepare_key(base)
+        return self._iter_keys(path, path, reverse)
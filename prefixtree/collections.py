@@ -1,15 +1,14 @@
 "Prefix tree base dictionary object"
-from __future__ import absolute_import
+import heapq
 import itertools
+from collections import abc
 
-try:
-    # python 3.3+
-    from collections import abc
-except ImportError:
-    # python 3.2 
-    import collections as abc
-
-from prefixtree.trie import TrieBase, iord
+from prefixtree.arena import ArenaTrie, NONE
+from prefixtree.cursor import Cursor
+from prefixtree.frozen import FrozenTrie
+from prefixtree.matcher import Matcher
+from prefixtree.trie import TrieBase
+from prefixtree.views import ItemsView, KeysView, ValuesView
 
 
 class PrefixDict(TrieBase, abc.MutableMapping):
@@ -35,14 +34,14 @@ class PrefixDict(TrieBase, abc.MutableMapping):
 
     def _build_slice(self, key):
         if key.start is not None:
-            start = iord(self.prepare_key(key.start)[0])
+            start = self.prepare_key(key.start)[0]
         else:
-            start = tuple()
+            start = b''
 
         if key.stop is not None:
-            stop = iord(self.prepare_key(key.stop)[0])
+            stop = self.prepare_key(key.stop)[0]
         else:
-            stop = tuple()
+            stop = None
 
         if key.step is None or key.step == 1:
             reverse = False
@@ -53,32 +52,46 @@ class PrefixDict(TrieBase, abc.MutableMapping):
 
         return slice(start, stop, reverse)
 
+    def _view_bounds(self, prefix, start, stop):
+        """Return the bounds of a view from its prefix, start and stop.
+
+        Raises ValueError if prefix is given with start or stop.
+        """
+        if prefix is not None:
+            if start is not None or stop is not None:
+                msg = "prefix cannot be combined with start or stop"
+                raise ValueError(msg)
+            path, _ = self.prepare_key(prefix)
+            return path, path
+        cut = self._build_slice(slice(start, stop))
+        return cut.start, cut.stop
+
     def __delitem__(self, key):
         if not isinstance(key, slice):
             try:
                 path, _ = self.prepare_key(key)
-                leaf = self._delete(iord(path), self._root)
-                del leaf.value, leaf.meta
+                self._delete(path, self._root)
                 self._values -= 1
             except AttributeError:
                 raise KeyError(key)
+            if self.counted:
+                self._recount(path, -1)
+            if self.weighted:
+                self._reweigh(path)
         else:
             cut = self._build_slice(key)
-            for node in self._iter(self._root, cut.start, cut.stop, cut.step):
-                if not hasattr(node, 'value'):
-                    continue
-                leaf = self._delete(iord(node.path), self._root)
-                del leaf.value, leaf.meta
-                self._values -= 1
+            self._delete_range(cut.start, cut.stop)
 
     def __getitem__(self, key):
         if not isinstance(key, slice):
             try:
                 path, _ = self.prepare_key(key)
-                leaf = self._search(iord(path), self._root)
-                return leaf.value
+                leaf = self._find(path)
             except AttributeError:
                 raise KeyError(key)
+            if leaf.meta is None:
+                raise KeyError(key)
+            return leaf.value
         else:
             cut = self._build_slice(key)
             return self._iter_values(self._root, cut.start, cut.stop, cut.step)
@@ -86,22 +99,192 @@ class PrefixDict(TrieBase, abc.MutableMapping):
     def __setitem__(self, key, value):
         if not isinstance(key, slice):
             path, meta = self.prepare_key(key)
-            leaf = self._insert(iord(path), self._root)
-            if not hasattr(leaf, 'value'):
+            leaf = self._store(path)
+            raised = self.weighted and (leaf.meta is None or
+                                        value >= leaf.value)
+            if leaf.meta is None:
                 self._values += 1
+                if self.counted:
+                    self._recount(path, 1)
             leaf.value = value
             leaf.meta = meta
+            if self.weighted:
+                self._reweigh(path, raised)
         else:
             cut = self._build_slice(key)
             values = iter(value)
-            for node in self._iter(self._root, cut.start, cut.stop, cut.step):
-                if not hasattr(node, 'value'):
+            nodes = self._iter(self._root, cut.start, cut.stop, cut.step)
+            for path, node in nodes:
+                if node.meta is None:
                     continue
                 try:
-                    node.value = next(values)
+                    new = next(values)
                 except StopIteration:
                     msg = "Fewer new elements to than slice length"
                     raise ValueError(msg)
+                raised = self.weighted and new >= node.value
+                node.value = new
+                if self.weighted:
+                    self._reweigh(bytes(path), raised)
+
+    def items(self, prefix=None, start=None, stop=None):
+        """Return a view of the (key, value) pairs.
+
+        The view may be limited to keys beginning with prefix, or to the keys
+        from start to stop as for a slice. Iterating over the view walks the
+        trie once.
+        """
+        return ItemsView(self, *self._view_bounds(prefix, start, stop))
+
+    def keys(self, prefix=None, start=None, stop=None):
+        "Return a view of the keys, limited as for items."
+        return KeysView(self, *self._view_bounds(prefix, start, stop))
+
+    def values(self, prefix=None, start=None, stop=None):
+        "Return a view of the values, limited as for items."
+        return ValuesView(self, *self._view_bounds(prefix, start, stop))
+
+    def compile_matcher(self):
+        """Return a Matcher for the current keys and values.
+
+        The Matcher finds every occurrence of every key in a stream of bytes
+        in a single pass.
+        """
+        return Matcher(self)
+
+    def cursor(self, position=None):
+        """Return a Cursor over the keys, before the first key.
+
+        If position is a token from Cursor.position, the cursor is restored
+        to it.
+        """
+        cursor = Cursor(self)
+        if position is not None:
+            cursor.restore(position)
+        return cursor
+
+    def ceiling(self, key, values=False):
+        """Return the least key greater than or equal to key.
+
+        As for TrieBase.ceiling. If values is True, (key, value) is returned
+        instead.
+        """
+        found, node = self._neighbour(key, False, True)
+        return (found, node.value) if values else found
+
+    def floor(self, key, values=False):
+        "Return the greatest key less than or equal to key, as for ceiling."
+        found, node = self._neighbour(key, True, True)
+        return (found, node.value) if values else found
+
+    def higher(self, key, values=False):
+        "Return the least key greater than key, as for ceiling."
+        found, node = self._neighbour(key, False, False)
+        return (found, node.value) if values else found
+
+    def lower(self, key, values=False):
+        "Return the greatest key less than key, as for ceiling."
+        found, node = self._neighbour(key, True, False)
+        return (found, node.value) if values else found
+
+    def fuzzy(self, key, max_distance, values=False):
+        """Iterate over (key, distance) for keys within max_distance of key.
+
+        As for TrieBase.fuzzy. If values is True, (key, value, distance) is
+        returned instead.
+        """
+        path, _ = self.prepare_key(key)
+        for found, node, distance in self._fuzzy(path, max_distance):
+            found = self.restore_key(bytes(found), node.meta)
+            if values:
+                yield found, node.value, distance
+            else:
+                yield found, distance
+
+    def get_many(self, keys, default=None):
+        """Return a list of the value for each key, in input order.
+
+        Missing keys give default. The keys are looked up in sorted order,
+        sharing the walk from the root between keys with common prefixes.
+        """
+        paths = [self.prepare_key(key)[0] for key in keys]
+        return [node.value if node is not None and node.meta is not None
+                else default for node in self._search_many(paths)]
+
+    def longest_prefix(self, key):
+        """Return (key, value) for the longest key that is a prefix of key.
+
+        Raises KeyError if no key is a prefix of key.
+        """
+        path, _ = self.prepare_key(key)
+        prefixes = self._prefixes(path)
+        if not prefixes:
+            raise KeyError(key)
+        offset, node = prefixes[-1]
+        return self.restore_key(path[:offset], node.meta), node.value
+
+    def max(self, values=False):
+        """Return the greatest key, or (key, value) if values is True.
+
+        Raises ValueError if there are no keys.
+        """
+        if not self._values:
+            raise ValueError("max() of an empty trie")
+        found, node = self._rightmost(b'', self._root)
+        found = self.restore_key(found, node.meta)
+        return (found, node.value) if values else found
+
+    def min(self, values=False):
+        """Return the least key, or (key, value) if values is True.
+
+        Raises ValueError if there are no keys.
+        """
+        if not self._values:
+            raise ValueError("min() of an empty trie")
+        found, node = self._leftmost(b'', self._root)
+        found = self.restore_key(found, node.meta)
+        return (found, node.value) if values else found
+
+    def top_k(self, prefix, k):
+        """Return (key, value) for the k best keys beginning with prefix.
+
+        The keys with the highest values are returned highest first, and
+        ties in key order. Unless weighted is True, every key
+        beginning with prefix is visited.
+        """
+        path, _ = self.prepare_key(prefix)
+        if self.weighted:
+            found = self._top(path, k)
+        else:
+            nodes = self._iter(self._root, path, path)
+            found = heapq.nsmallest(k, ((-node.value, bytes(path), node)
+                                        for path, node in nodes
+                                        if node.meta is not None))
+            found = [(path, node) for _, path, node in found]
+        return [(self.restore_key(path, node.meta), node.value)
+                for path, node in found]
+
+    @classmethod
+    def fromsorted(cls, iterable):
+        """Create a PrefixDict from (key, value) pairs sorted by key.
+
+        Keys are ordered as they are iterated, by their UTF-8 encoding. Each
+        key is inserted from the node it shares with the previous key rather
+        than from the root. Raises ValueError if the keys are not sorted.
+        """
+        trie = cls()
+        for leaf, meta, value in trie._insert_sorted(iterable):
+            if leaf.meta is None:
+                trie._values += 1
+            leaf.value = value
+            leaf.meta = meta
+        if trie.counted or trie.weighted:
+            trie._recompute(trie._root)
+        return trie
+
+    def freeze(self):
+        "Return an immutable copy compiled into flat arrays."
+        return FrozenPrefixDict(self)
 
 
 class PrefixSet(TrieBase, abc.MutableSet):
@@ -120,25 +303,106 @@ class PrefixSet(TrieBase, abc.MutableSet):
                 msg = "{0} object is not iterable"
                 raise TypeError(msg.format(args[0].__class__.__name__))
 
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return cls(list(iterable))
+
+    def __and__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__and__(self, other)
+        return self._combine(other, False, False, True)
+
     def __contains__(self, key):
         try:
             path, _ = self.prepare_key(key)
-            leaf = self._search(iord(path), self._root)
-            if hasattr(leaf, 'value'):
-                return True
+            return self._find(path).meta is not None
         except AttributeError:
             return False
 
+    def __eq__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__eq__(self, other)
+        return self._same_keys(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __iand__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__iand__(self, other)
+        return self._replace(other, False, False, True)
+
+    def __ior__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__ior__(self, other)
+        return self._replace(other, True, True, True)
+
+    def __isub__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__isub__(self, other)
+        return self._replace(other, True, False, False)
+
+    def __ixor__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__ixor__(self, other)
+        return self._replace(other, True, True, False)
+
+    def __or__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__or__(self, other)
+        return self._combine(other, True, True, True)
+
+    def __sub__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__sub__(self, other)
+        return self._combine(other, True, False, False)
+
+    def __xor__(self, other):
+        if not self._mergeable(other):
+            return abc.MutableSet.__xor__(self, other)
+        return self._combine(other, True, True, False)
+
+    def _combine(self, other, left, right, both):
+        "Return a new set combining this set and other, as for _merge."
+        combined = self.__class__()
+        combined._graft(*self._merge(other, left, right, both))
+        return combined
+
+    def _graft(self, root, count):
+        "Replace the trie with root holding count keys."
+        self._root = root
+        self._values = count
+        self._drop_finger()
+        if self.compressed:
+            self._compact(root)
+        if self.counted:
+            self._recompute(root)
+
+    def _mergeable(self, other):
+        """Return True if other can be combined by walking both tries.
+
+        Other must be a PrefixSet with the same compressed setting, other
+        sets are combined by the generic Set methods.
+        """
+        return (isinstance(other, PrefixSet) and
+                other.compressed == self.compressed)
+
+    def _replace(self, other, left, right, both):
+        "Combine other into this set in place, as for _merge."
+        self._graft(*self._merge(other, left, right, both))
+        return self
+
     def add(self, key):
         """Add an element to a set.
 
         This has no effect if the element is already present.
         """
         path, meta = self.prepare_key(key)
-        leaf = self._insert(iord(path), self._root)
-        if not hasattr(leaf, 'value'):
+        leaf = self._store(path)
+        if leaf.meta is None:
             self._values += 1
-        leaf.value = None
+            if self.counted:
+                self._recount(path, 1)
         leaf.meta = meta
 
     def discard(self, key):
@@ -148,8 +412,218 @@ class PrefixSet(TrieBase, abc.MutableSet):
         """
         try:
             path, _ = self.prepare_key(key)
-            leaf = self._delete(iord(path), self._root)
-            del leaf.value, leaf.meta
+            self._delete(path, self._root)
             self._values -= 1
+        except AttributeError:
+            return
+        if self.counted:
+            self._recount(path, -1)
+
+    def isdisjoint(self, other):
+        "Return True if the set has no elements in common with other."
+        if not self._mergeable(other):
+            return abc.MutableSet.isdisjoint(self, other)
+        return not self._overlaps(other)
+
+    def compile_matcher(self):
+        """Return a Matcher for the current elements.
+
+        As for PrefixDict.compile_matcher, with values of None.
+        """
+        return Matcher(self, values=False)
+
+    def cursor(self, position=None):
+        """Return a Cursor over the elements, before the first element.
+
+        As for PrefixDict.cursor.
+        """
+        cursor = Cursor(self)
+        if position is not None:
+            cursor.restore(position)
+        return cursor
+
+    def longest_prefix(self, key):
+        """Return the longest element that is a prefix of key.
+
+        Raises KeyError if no element is a prefix of key.
+        """
+        path, _ = self.prepare_key(key)
+        prefixes = self._prefixes(path)
+        if not prefixes:
+            raise KeyError(key)
+        offset, node = prefixes[-1]
+        return self.restore_key(path[:offset], node.meta)
+
+    @classmethod
+    def fromsorted(cls, iterable):
+        """Create a PrefixSet from keys in sorted order.
+
+        As for PrefixDict.fromsorted.
+        """
+        trie = cls()
+        items = ((key, None) for key in iterable)
+        for leaf, meta, _ in trie._insert_sorted(items):
+            if leaf.meta is None:
+                trie._values += 1
+            leaf.meta = meta
+        if trie.counted:
+            trie._recompute(trie._root)
+        return trie
+
+    def freeze(self):
+        "Return an immutable copy compiled into flat arrays."
+        return FrozenPrefixSet(self)
+
+
+class ArenaPrefixDict(ArenaTrie, abc.MutableMapping):
+    "Dictionary object using prefix trie held in arrays"
+
+    def __init__(self, *args, **kwargs):
+        ArenaTrie.__init__(self)
+        self.update(*args, **kwargs)
+
+    _build_slice = PrefixDict._build_slice
+
+    def __contains__(self, key):
+        path, _ = self.prepare_key(key)
+        node = self._search(path)
+        return node != NONE and self._slots[node] != NONE
+
+    def __delitem__(self, key):
+        if not isinstance(key, slice):
+            try:
+                path, _ = self.prepare_key(key)
+                self._delete(path)
+            except AttributeError:
+                raise KeyError(key)
+        else:
+            cut = self._build_slice(key)
+            self._delete_range(cut.start, cut.stop)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            path, _ = self.prepare_key(key)
+            node = self._search(path)
+            slot = self._slots[node] if node != NONE else NONE
+            if slot == NONE:
+                raise KeyError(key)
+            return self._data[slot]
+        else:
+            cut = self._build_slice(key)
+            return self._iter_values(cut.start, cut.stop, cut.step)
+
+    def __setitem__(self, key, value):
+        if not isinstance(key, slice):
+            path, meta = self.prepare_key(key)
+            self._set(self._insert(path), value, meta)
+        else:
+            cut = self._build_slice(key)
+            values = iter(value)
+            for _, node in self._iter(cut.start, cut.stop, cut.step):
+                slot = self._slots[node]
+                if slot == NONE:
+                    continue
+                try:
+                    self._data[slot] = next(values)
+                except StopIteration:
+                    msg = "Fewer new elements to than slice length"
+                    raise ValueError(msg)
+
+
+class ArenaPrefixSet(ArenaTrie, abc.MutableSet):
+    "Set object using prefix trie held in arrays"
+
+    def __init__(self, *args):
+        ArenaTrie.__init__(self)
+        if len(args) > 1:
+            msg = "{0} expected at most 1 arguments, got 2"
+            raise TypeError(msg.format(self.__class__.__name__))
+        if len(args) == 1:
+            for key in args[0]:
+                self.add(key)
+
+    def __contains__(self, key):
+        path, _ = self.prepare_key(key)
+        node = self._search(path)
+        return node != NONE and self._slots[node] != NONE
+
+    def add(self, key):
+        """Add an element to a set.
+
+        This has no effect if the element is already present.
+        """
+        path, meta = self.prepare_key(key)
+        self._set(self._insert(path), None, meta)
+
+    def discard(self, key):
+        """Remove an element from a set if it is a member.
+
+        If the element is not a member, do nothing.
+        """
+        try:
+            path, _ = self.prepare_key(key)
+            self._delete(path)
         except AttributeError:
             pass
+
+
+class FrozenPrefixDict(FrozenTrie, abc.Mapping):
+    "Immutable dictionary object using compiled prefix trie"
+
+    def __init__(self, *args, **kwargs):
+        if len(args) == 1 and not kwargs and isinstance(args[0], TrieBase):
+            trie = args[0]
+        else:
+            trie = PrefixDict(*args, **kwargs)
+        FrozenTrie.__init__(self, trie)
+
+    _build_slice = PrefixDict._build_slice
+
+    @classmethod
+    def open(cls, filename):
+        """Open a compiled trie written by write.
+
+        As for FrozenTrie.open, the file must be trusted. Raises ValueError
+        if the file was written without values.
+        """
+        frozen = super(FrozenPrefixDict, cls).open(filename)
+        if frozen._values is None:
+            raise ValueError("{0} holds no values".format(filename))
+        return frozen
+
+    def __contains__(self, key):
+        path, _ = self.prepare_key(key)
+        return self._find(path) is not None
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            path, _ = self.prepare_key(key)
+            rank = self._find(path)
+            if rank is None:
+                raise KeyError(key)
+            return self._values[rank]
+        else:
+            cut = self._build_slice(key)
+            lower, upper = self._bounds(cut.start, cut.stop)
+            return self._iter_values(lower, upper, cut.step)
+
+
+class FrozenPrefixSet(FrozenTrie, abc.Set):
+    "Immutable set object using compiled prefix trie"
+
+    def __init__(self, *args):
+        if len(args) == 1 and isinstance(args[0], TrieBase):
+            trie = args[0]
+        else:
+            trie = PrefixSet(*args)
+        FrozenTrie.__init__(self, trie, values=False)
+
+    __hash__ = abc.Set._hash
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        return cls(list(iterable))
+
+    def __contains__(self, key):
+        path, _ = self.prepare_key(key)
+        return self._find(path) is not None
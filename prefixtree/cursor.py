@@ -0,0 +1,237 @@
+"Cursor moving through the keys of a Trie in order"
+from prefixtree.trie import char
+
+# First byte of a position token, followed by the key for AT.
+BEFORE = b'<'
+AT = b'='
+AFTER = b'>'
+
+
+class Cursor(object):
+    """Position among the keys of a trie, moved a key at a time.
+
+    The cursor holds _trail, a list of (node, length) pairs for the nodes
+    from the root to the node of the current key, where length is the
+    length of the key of the node, and _path, the current key. Moving to
+    the next or previous key only visits the nodes between the two keys,
+    so a full scan visits each node a constant number of times.
+
+    When the trail is empty the cursor is before the first key if _before
+    is True, otherwise after the last key. When _between is True the cursor
+    is just before the key of the trail rather than at it, as after
+    restoring a position whose key has since been removed.
+
+    Changing the trie invalidates the cursor, a position taken beforehand
+    may be restored into a new cursor.
+    """
+
+    def __init__(self, trie):
+        self._trie = trie
+        self._trail = []
+        self._path = b''
+        self._before = True
+        self._between = False
+
+    def __iter__(self):
+        while self.next():
+            yield self.key
+
+    def _climb(self):
+        """Move to the first subtree after the current node.
+
+        Pops nodes from the trail until one has a later sibling, which is
+        pushed. Returns False if there is none.
+        """
+        trail = self._trail
+        while len(trail) > 1:
+            trail.pop()
+            parent, depth = trail[-1]
+            byte = self._path[depth]
+            for key, sibling in parent._range(byte + 1, 255):
+                self._push(depth, key, sibling)
+                return True
+        del trail[:]
+        return False
+
+    def _leftmost(self):
+        """Move to the first key below and including the current node.
+
+        Returns False, leaving the cursor after the last key, if there is
+        none, which is only the case for an empty trie.
+        """
+        node, length = self._trail[-1]
+        while node.meta is None:
+            for key, child in node:
+                self._push(length, key, child)
+                node, length = child, len(self._path)
+                break
+            else:
+                return self._stop(False)
+        return True
+
+    def _push(self, depth, key, node):
+        "Append the child node reached by key from the node at depth."
+        self._path = self._path[:depth] + char(key) + node._edge
+        self._trail.append((node, len(self._path)))
+
+    def _rightmost(self):
+        "Move to the last key below and including the current node."
+        node, length = self._trail[-1]
+        while len(node):
+            for key, child in reversed(node):
+                self._push(length, key, child)
+                node, length = child, len(self._path)
+                break
+        return True
+
+    def _start(self):
+        "Place the cursor at the root."
+        self._trail = [(self._trie._root, 0)]
+        self._path = b''
+        self._between = False
+
+    def _stop(self, before):
+        "Place the cursor before the first key or after the last key."
+        self._trail = []
+        self._path = b''
+        self._before = before
+        self._between = False
+        return False
+
+    def _node(self):
+        "Return the node of the current key."
+        if not self._trail or self._between:
+            raise ValueError("cursor is not at a key")
+        return self._trail[-1][0]
+
+    @property
+    def key(self):
+        "The current key."
+        node = self._node()
+        return self._trie.restore_key(self._path, node.meta)
+
+    @property
+    def value(self):
+        "The value of the current key of a dictionary."
+        return self._node().value
+
+    def first(self):
+        "Move to the first key, returning False if there are no keys."
+        self._start()
+        return self._leftmost()
+
+    def last(self):
+        "Move to the last key, returning False if there are no keys."
+        self._start()
+        if not len(self._trie._root) and self._trie._root.meta is None:
+            return self._stop(True)
+        return self._rightmost()
+
+    def next(self):
+        """Move to the next key, returning False if there is none.
+
+        The cursor is then after the last key.
+        """
+        if not self._trail:
+            if self._before:
+                return self.first()
+            return False
+        if self._between:
+            self._between = False
+            return True
+        node, length = self._trail[-1]
+        for key, child in node:
+            self._push(length, key, child)
+            return self._leftmost()
+        if self._climb():
+            return self._leftmost()
+        return self._stop(False)
+
+    def prev(self):
+        """Move to the previous key, returning False if there is none.
+
+        The cursor is then before the first key.
+        """
+        if not self._trail:
+            if not self._before:
+                return self.last()
+            return False
+        self._between = False
+        trail = self._trail
+        while len(trail) > 1:
+            trail.pop()
+            parent, depth = trail[-1]
+            byte = self._path[depth]
+            for key, sibling in parent._range(0, byte - 1, reverse=True):
+                self._push(depth, key, sibling)
+                return self._rightmost()
+            self._path = self._path[:depth]
+            if parent.meta is not None:
+                return True
+        return self._stop(True)
+
+    def seek(self, key, inclusive=True):
+        """Move to the first key at least key, or after key if inclusive is
+        False. Returns False if there is no such key.
+
+        The key need not be present.
+        """
+        path, _ = self._trie.prepare_key(key)
+        self._start()
+        node, offset = self._trail[-1]
+        while offset < len(path):
+            byte = path[offset]
+            child = node[byte]
+            if child is None:
+                for branch, sibling in node._range(byte + 1, 255):
+                    self._push(offset, branch, sibling)
+                    return self._leftmost()
+                if self._climb():
+                    return self._leftmost()
+                return self._stop(False)
+            self._push(offset, byte, child)
+            edge = child._edge
+            segment = path[offset + 1:offset + 1 + len(edge)]
+            if segment != edge:
+                if segment < edge:
+                    return self._leftmost()
+                if self._climb():
+                    return self._leftmost()
+                return self._stop(False)
+            node, offset = child, len(self._path)
+        if node.meta is not None and inclusive:
+            return True
+        return self.next()
+
+    def position(self):
+        """Return a token for the current position.
+
+        The token is a byte string that may be stored and passed to restore.
+        """
+        if self._between:
+            raise ValueError("cursor is not at a key")
+        if not self._trail:
+            return BEFORE if self._before else AFTER
+        return AT + self._path
+
+    def restore(self, token):
+        """Move to the position of a token returned by position.
+
+        If the key of the token has since been removed, the cursor is placed
+        between the keys around it, so that next moves to the following key
+        and prev to the preceding key. Returns False if the cursor is not at
+        a key. Raises ValueError if token is not a position.
+        """
+        if not isinstance(token, bytes):
+            raise ValueError("position must be a byte string")
+        kind, path = token[:1], token[1:]
+        if token in (BEFORE, AFTER):
+            return self._stop(token == BEFORE)
+        if kind != AT:
+            raise ValueError("invalid cursor position {0!r}".format(token))
+        if not self.seek(path):
+            return False
+        if self._path != path:
+            self._between = True
+            return False
+        return True
@@ -0,0 +1,487 @@
+"""Immutable Trie compiled into flat typed arrays
+
+A compiled trie can be written to a file and opened again with mmap, so the
+arrays are read directly from the mapped pages. The file starts with a
+header of the magic bytes, the format version and flags, all packed as
+HEADER. A SECTION entry follows for each array, in the order of ARRAYS,
+giving the byte offset and the number of items of the array. Each array is
+stored little endian and starts at a multiple of 8 bytes.
+
+If the HAS_VALUES flag is set, two more sections follow. The first holds
+the offset of the pickled value of each key, with a final entry holding the
+total length, and the second the concatenated pickles.
+
+Values are read with pickle.loads, which can run arbitrary code, so only
+files from a trusted source should be opened. Files without values are
+never unpickled.
+"""
+from array import array
+import mmap
+import pickle
+import struct
+import sys
+
+from prefixtree.trie import TrieBase, common_length
+
+# Value of an unused slot in FrozenTrie._checks.
+EMPTY = 0x7FFFFFFF
+
+# Number of free slots tried for a node before placing it past the end.
+PLACE_ATTEMPTS = 32
+
+MAGIC = b'PFXT'
+VERSION = 1
+HAS_VALUES = 1
+
+HEADER = struct.Struct('<4sHH')
+SECTION = struct.Struct('<QQ')
+
+# Attribute and array type code for each array stored in a file.
+ARRAYS = (
+    ('_node_bytes', 'B'),
+    ('_ends', 'I'),
+    ('_ranks', 'I'),
+    ('_meta', 'B'),
+    ('_slots', 'I'),
+    ('_bases', 'I'),
+    ('_checks', 'i'),
+    ('_orders', 'I'),
+    ('_edge_starts', 'I'),
+    ('_edges', 'B'),
+)
+VALUE_ARRAYS = (
+    ('_offsets', 'Q'),
+    ('_data', 'B'),
+)
+
+
+def read_array(view, offset, count, code):
+    "Return count items of type code from view, copying only if swapped."
+    size = count * array(code).itemsize
+    section = view[offset:offset + size]
+    if len(section) != size:
+        raise ValueError("compiled trie is truncated")
+    if sys.byteorder == 'little':
+        return section.cast(code)
+    items = array(code, section.tobytes())
+    items.byteswap()
+    return items
+
+
+def write_array(stream, items, code):
+    "Write items to stream as a little endian array of type code."
+    if sys.byteorder != 'little' and array(code).itemsize > 1:
+        items = array(code, items)
+        items.byteswap()
+    stream.write(memoryview(items).cast('B'))
+
+
+class PickledValues(object):
+    "Sequence of values unpickled from a buffer as they are accessed."
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __getitem__(self, rank):
+        first, last = self._offsets[rank], self._offsets[rank + 1]
+        return pickle.loads(self._data[first:last])
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+class FrozenTrie(object):
+    """Base class for immutable collections implemented using a Trie.
+
+    The trie is compiled from a TrieBase and stored in flat arrays without
+    any per node Python objects. Runs of single child nodes are always
+    collapsed into one edge. Every node has both a slot, used for lookups,
+    and an order, used for iteration.
+
+    Slots form a double array. The child for byte b of the node in slot s is
+    in slot _bases[s] + b, provided _checks holds s for that slot, or ~s if
+    the child has an edge. The edge is held in _edges from the _edge_starts
+    of the slot to that of the next slot, and _orders holds the order of the
+    node.
+
+    Orders number nodes in key order, so any range of keys is a contiguous
+    range of orders. For each order _slots holds the slot of the node,
+    _node_bytes the branch byte leading to it and _ends the order following
+    its subtree. _ranks holds the number of keys before each order, with a
+    final entry holding the total. A node is a key when its rank is less
+    than the rank of the next order.
+
+    The meta for each key and, unless values is False, the value are stored
+    by rank.
+    """
+
+    def __init__(self, trie, values=True):
+        self._compile(trie._root, values)
+
+    def __iter__(self):
+        return self._iter_keys()
+
+    def __len__(self):
+        return len(self._meta)
+
+    def __reversed__(self):
+        return self._iter_keys(reverse=True)
+
+    def _bounds(self, start=b'', stop=None):
+        """Return the range of orders within start and stop.
+
+        The bounds are those used by TrieBase._iter.
+        """
+        return self._lower(start), self._upper(stop)
+
+    def _children(self, order):
+        "Return the orders of the children of a node."
+        ends = self._ends
+        children = []
+        child, end = order + 1, ends[order]
+        while child < end:
+            children.append(child)
+            child = ends[child]
+        return children
+
+    def _compile(self, root, keep_values):
+        node_bytes, ends, ranks = array('B'), array('I'), array('I')
+        edges, parents, meta, values = [], [], bytearray(), []
+        stack = [(0, b'', root, 0)]
+        while stack:
+            byte, edge, node, parent = stack.pop()
+            if node is None:
+                ends[parent] = len(ends)
+                continue
+            order = len(ends)
+            node_bytes.append(byte)
+            edges.append(edge)
+            parents.append(parent)
+            ranks.append(len(meta))
+            ends.append(0)
+            if node.meta is not None:
+                meta.append(node.meta)
+                if keep_values:
+                    values.append(node.value)
+            stack.append((0, b'', None, order))
+            children = []
+            for key, child in node:
+                edge = bytearray(child._edge)
+                while child.meta is None and len(child) == 1:
+                    for branch, child in child:
+                        edge.append(branch)
+                        edge += child._edge
+                children.append((key, bytes(edge), child, order))
+            stack.extend(reversed(children))
+        ranks.append(len(meta))
+        self._node_bytes = node_bytes
+        self._ends = ends
+        self._ranks = ranks
+        self._meta = meta
+        self._values = values if keep_values else None
+        self._place(edges, parents)
+
+    def _edge(self, order):
+        slot = self._slots[order]
+        first, last = self._edge_starts[slot], self._edge_starts[slot + 1]
+        return bytes(self._edges[first:last])
+
+    def _find(self, path):
+        "Return the rank of path, or None if it is not a key."
+        bases, checks = self._bases, self._checks
+        node, offset, length = 0, 0, len(path)
+        while offset < length:
+            slot = bases[node] + path[offset]
+            check = checks[slot]
+            offset += 1
+            if check != node:
+                if check != ~node:
+                    return None
+                first = self._edge_starts[slot]
+                last = self._edge_starts[slot + 1]
+                if not path.startswith(self._edges[first:last], offset):
+                    return None
+                offset += last - first
+            node = slot
+        return self._rank(node)
+
+    def _iter(self, lower=0, upper=None, reverse=False):
+        """Iterate over (path, order) pairs for keys ordered lower to upper.
+
+        The path is a buffer shared by the whole traversal, copy it before
+        advancing the iterator if it needs to be kept.
+        """
+        if upper is None:
+            upper = len(self._ends)
+        if lower >= upper:
+            return
+        node_bytes, ends, ranks = self._node_bytes, self._ends, self._ranks
+        slots, edges, edge_starts = self._slots, self._edges, self._edge_starts
+        path = bytearray()
+        stack = [(0, 0, False)]
+        while stack:
+            depth, order, emit = stack.pop()
+            del path[depth:]
+            if emit:
+                yield path, order
+                continue
+            if order:
+                path.append(node_bytes[order])
+                slot = slots[order]
+                path += edges[edge_starts[slot]:edge_starts[slot + 1]]
+            depth = len(path)
+            if lower <= order and ranks[order] != ranks[order + 1]:
+                if not reverse:
+                    yield path, order
+                else:
+                    stack.append((depth, order, True))
+            children = self._children(order)
+            if not reverse:
+                children.reverse()
+            for child in children:
+                if child < upper and ends[child] > lower:
+                    stack.append((depth, child, False))
+
+    def _iter_keys(self, lower=0, upper=None, reverse=False):
+        meta, ranks = self._meta, self._ranks
+        for path, order in self._iter(lower, upper, reverse):
+            yield self.restore_key(bytes(path), meta[ranks[order]])
+
+    def _iter_values(self, lower=0, upper=None, reverse=False):
+        values, ranks = self._values, self._ranks
+        for _, order in self._iter(lower, upper, reverse):
+            yield values[ranks[order]]
+
+    def _lower(self, start):
+        "Return the order of the first node with a path of at least start."
+        node_bytes, ends = self._node_bytes, self._ends
+        order, depth = 0, 0
+        while depth < len(start):
+            byte = start[depth]
+            for child in self._children(order):
+                if node_bytes[child] >= byte:
+                    break
+            else:
+                return ends[order]
+            if node_bytes[child] != byte:
+                return child
+            depth += 1
+            edge = self._edge(child)
+            part = start[depth:depth + len(edge)]
+            if edge[:len(part)] != part:
+                return child if edge[:len(part)] > part else ends[child]
+            if len(part) < len(edge):
+                return child
+            depth += len(edge)
+            order = child
+        return order
+
+    def _map(self, view):
+        "Use the arrays of a compiled trie held in view."
+        header = view[:HEADER.size].tobytes()
+        if len(header) != HEADER.size:
+            raise ValueError("compiled trie is truncated")
+        magic, version, flags = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a compiled trie of version {0}".format(
+                VERSION))
+        sections = ARRAYS
+        if flags & HAS_VALUES:
+            sections += VALUE_ARRAYS
+        position = HEADER.size
+        arrays = {}
+        for name, code in sections:
+            entry = view[position:position + SECTION.size].tobytes()
+            if len(entry) != SECTION.size:
+                raise ValueError("compiled trie is truncated")
+            offset, count = SECTION.unpack(entry)
+            arrays[name] = read_array(view, offset, count, code)
+            position += SECTION.size
+        for name, _ in ARRAYS:
+            setattr(self, name, arrays[name])
+        if flags & HAS_VALUES:
+            self._values = PickledValues(arrays['_offsets'], arrays['_data'])
+        else:
+            self._values = None
+
+    def _place(self, edges, parents):
+        "Assign each node a slot in the double array."
+        count = len(parents)
+        children = [[] for _ in range(count)]
+        for order in range(1, count):
+            children[parents[order]].append(order)
+        node_bytes = self._node_bytes
+        slots, node_bases = array('I', [0]) * count, array('I', [0]) * count
+        used = bytearray(count + 512)
+        used[0] = 1
+        free = top = 1
+        for order in range(count):
+            keys = [node_bytes[child] for child in children[order]]
+            if not keys:
+                continue
+            first, last = keys[0], keys[-1]
+            slot = max(free, first + 1)
+            for _ in range(PLACE_ATTEMPTS):
+                slot = used.find(0, slot, top)
+                if slot < 0:
+                    break
+                base = slot - first
+                if not any(used[base + key] for key in keys):
+                    break
+                slot += 1
+            else:
+                # Give up on the holes searched so far for later nodes too.
+                free = slot
+                slot = -1
+            if slot < 0:
+                slot = max(top, first + 1)
+            base = slot - first
+            top = max(top, base + last + 1)
+            if top + 256 > len(used):
+                used.extend(bytearray(len(used)))
+            node_bases[order] = base
+            for child, key in zip(children[order], keys):
+                slots[child] = base + key
+                used[base + key] = 1
+            free = used.find(0, free, top)
+            if free < 0:
+                free = top
+        size = top + 256
+        bases = array('I', [0]) * size
+        checks = array('i', [EMPTY]) * size
+        orders = array('I', [0]) * size
+        for order in range(count):
+            slot = slots[order]
+            bases[slot] = node_bases[order]
+            orders[slot] = order
+            if order:
+                parent = slots[parents[order]]
+                checks[slot] = ~parent if edges[order] else parent
+        data = bytearray()
+        edge_starts = array('I', [0]) * (size + 1)
+        for slot in range(size):
+            edge_starts[slot] = len(data)
+            if checks[slot] < 0:
+                data += edges[orders[slot]]
+        edge_starts[size] = len(data)
+        self._bases = bases
+        self._checks = checks
+        self._edges = bytes(data)
+        self._edge_starts = edge_starts
+        self._orders = orders
+        self._slots = slots
+
+    def _rank(self, slot):
+        "Return the rank of the node in slot, or None if it is not a key."
+        order = self._orders[slot]
+        rank = self._ranks[order]
+        return rank if rank != self._ranks[order + 1] else None
+
+    def _upper(self, stop):
+        """Return the order of the first node beyond stop.
+
+        A node is beyond stop if the prefix of its path with the length of
+        stop is greater than stop.
+        """
+        if stop is None:
+            return len(self._ends)
+        node_bytes, ends = self._node_bytes, self._ends
+        order, depth = 0, 0
+        while depth < len(stop):
+            byte = stop[depth]
+            child = None
+            for candidate in self._children(order):
+                if node_bytes[candidate] > byte:
+                    break
+                child = candidate
+            if child is None:
+                return order + 1
+            if node_bytes[child] != byte:
+                return ends[child]
+            depth += 1
+            edge = self._edge(child)
+            part = stop[depth:depth + len(edge)]
+            if edge[:len(part)] != part:
+                return child if edge[:len(part)] > part else ends[child]
+            if len(part) < len(edge):
+                return ends[child]
+            depth += len(edge)
+            order = child
+        return ends[order]
+
+    def _pickle_values(self):
+        "Return the offsets and data of the pickled values."
+        values = self._values
+        if isinstance(values, PickledValues):
+            return values._offsets, values._data
+        offsets, data = array('Q', [0]), bytearray()
+        for value in values:
+            data += pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            offsets.append(len(data))
+        return offsets, data
+
+    prepare_key = TrieBase.prepare_key
+
+    restore_key = TrieBase.restore_key
+
+    def commonprefix(self, key, restore_key=True):
+        "Return longest common prefix between key and current keys."
+        path, _ = self.prepare_key(key)
+        bases, checks = self._bases, self._checks
+        node, depth = 0, 0
+        while depth < len(path):
+            slot = bases[node] + path[depth]
+            if checks[slot] not in (node, ~node):
+                break
+            edge = self._edge(self._orders[slot])
+            if not path.startswith(edge, depth + 1):
+                depth += 1 + common_length(edge, path, depth + 1)
+                return path[:depth]
+            depth += 1 + len(edge)
+            node = slot
+        rank = self._rank(node)
+        if restore_key and rank is not None:
+            return self.restore_key(path[:depth], self._meta[rank])
+        return path[:depth]
+
+    def startswith(self, base, reverse=False):
+        "Iterate over all keys with matching prefix."
+        path, _ = self.prepare_key(base)
+        lower, upper = self._bounds(path, path)
+        return self._iter_keys(lower, upper, reverse)
+
+    @classmethod
+    def open(cls, filename):
+        """Open a compiled trie written by write.
+
+        The file is mapped into memory and read in place. Values are only
+        unpickled when they are accessed. Unpickling can run arbitrary code,
+        so the file must come from a trusted source.
+        """
+        with open(filename, 'rb') as stream:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        frozen = cls.__new__(cls)
+        frozen._map(memoryview(mapped))
+        return frozen
+
+    def write(self, filename):
+        "Write the compiled trie to a file that can be opened with open."
+        sections = [(getattr(self, name), code) for name, code in ARRAYS]
+        flags = 0
+        if self._values is not None:
+            flags |= HAS_VALUES
+            pickled = self._pickle_values()
+            sections.extend(zip(pickled, (code for _, code in VALUE_ARRAYS)))
+        entries = []
+        offset = HEADER.size + SECTION.size * len(sections)
+        for items, code in sections:
+            offset += -offset % 8
+            entries.append(SECTION.pack(offset, len(items)))
+            offset += len(items) * array(code).itemsize
+        with open(filename, 'wb') as stream:
+            stream.write(HEADER.pack(MAGIC, VERSION, flags))
+            stream.write(b''.join(entries))
+            for items, code in sections:
+                stream.write(b'\0' * (-stream.tell() % 8))
+                write_array(stream, items, code)
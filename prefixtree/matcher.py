@@ -0,0 +1,157 @@
+"Aho-Corasick automaton compiled from the keys of a Trie"
+from array import array
+from collections import deque
+
+from prefixtree.trie import char
+
+# Number of bytes read at a time when scanning a file.
+CHUNK_SIZE = 1 << 16
+
+# Value of Matcher._outputs for a state where no key ends.
+NONE = -1
+
+
+class Matcher(object):
+    """Multi-pattern matcher for the keys of a trie.
+
+    States are numbered from the root, state 0, with one state for every
+    byte of every key, and are kept in flat typed arrays indexed by state.
+    The children of a state are numbered consecutively, starting at
+    _firsts[state], with _fanouts[state] of them, and _labels holds the
+    byte leading to each state, so the next state for a byte is found by
+    searching the labels of the children. _roots maps each byte straight
+    to the child of the root, or 0. _fails holds the state for the
+    longest proper suffix of the path of each state that is also a path,
+    and _links the nearest state along the failure links where a key ends,
+    or 0.
+
+    Keys are numbered by rank in key order. _outputs holds the rank of the
+    key ending at each state, or NONE, and _keys, _values and _lengths the
+    key, value and length in bytes for each rank.
+
+    The matcher is a snapshot, later changes to the trie are not reflected.
+    The empty key never matches.
+    """
+
+    def __init__(self, trie, values=True):
+        labels = bytearray(1)
+        firsts, fanouts = array('I', [0]), array('H', [0])
+        outputs = array('i', [NONE])
+        keys, found, lengths = [], [], array('I')
+        # Each entry is a state, the trie node it leads to, the path of the
+        # node, and the bytes of that path still to follow to reach it.
+        stack = [(0, trie._root, b'', b'')]
+        while stack:
+            state, node, path, rest = stack.pop()
+            if rest:
+                children = [(rest[0], node, path, rest[1:])]
+            else:
+                if node.meta is not None and state:
+                    outputs[state] = len(keys)
+                    keys.append(trie.restore_key(path, node.meta))
+                    found.append(node.value if values else None)
+                    lengths.append(len(path))
+                children = [(key, child, path + char(key) + child._edge,
+                             child._edge) for key, child in node]
+            firsts[state] = len(labels)
+            fanouts[state] = len(children)
+            for key, _, _, _ in children:
+                labels.append(key)
+            firsts.extend([0] * len(children))
+            fanouts.extend([0] * len(children))
+            outputs.extend([NONE] * len(children))
+            for offset in range(len(children) - 1, -1, -1):
+                _, child, child_path, child_rest = children[offset]
+                stack.append((firsts[state] + offset, child, child_path,
+                              child_rest))
+        self._labels = labels
+        self._firsts = firsts
+        self._fanouts = fanouts
+        self._outputs = outputs
+        self._keys = keys
+        self._values = found
+        self._lengths = lengths
+        self._link_failures()
+
+    def _goto(self, state, byte):
+        "Return the child of state for byte, or NONE."
+        first = self._firsts[state]
+        return self._labels.find(byte, first, first + self._fanouts[state])
+
+    def _link_failures(self):
+        "Set the failure and output links of every state breadth first."
+        goto, outputs = self._goto, self._outputs
+        fails = array('I', [0]) * len(outputs)
+        links = array('I', [0]) * len(outputs)
+        first = self._firsts[0]
+        queue = deque(range(first, first + self._fanouts[0]))
+        roots = array('I', [0]) * 256
+        for state in queue:
+            roots[self._labels[state]] = state
+        while queue:
+            state = queue.popleft()
+            first = self._firsts[state]
+            for child in range(first, first + self._fanouts[state]):
+                byte = self._labels[child]
+                fail = fails[state]
+                following = goto(fail, byte)
+                while following == NONE and fail:
+                    fail = fails[fail]
+                    following = goto(fail, byte)
+                fail = following if following != NONE else 0
+                fails[child] = fail
+                links[child] = fail if outputs[fail] != NONE else links[fail]
+                queue.append(child)
+        self._roots = roots
+        self._fails = fails
+        self._links = links
+
+    def scan(self, data):
+        """Iterate over (offset, key, value) for every match in data.
+
+        Offset is the position in data where the match starts. Data may be
+        bytes, bytearray, memoryview, a binary file, or an iterable of chunks
+        of any of these. Chunks are scanned in place, and matches spanning
+        chunk boundaries are found.
+        """
+        labels, firsts, fanouts = self._labels, self._firsts, self._fanouts
+        fails, links, outputs = self._fails, self._links, self._outputs
+        keys, values, lengths = self._keys, self._values, self._lengths
+        find, roots = labels.find, self._roots
+        state, offset = 0, 0
+        for chunk in chunks(data):
+            view = memoryview(chunk)
+            if view.format != 'B' or view.ndim != 1:
+                view = view.cast('B')
+            for byte in view:
+                offset += 1
+                while state:
+                    first = firsts[state]
+                    following = find(byte, first, first + fanouts[state])
+                    if following != NONE:
+                        state = following
+                        break
+                    state = fails[state]
+                else:
+                    state = roots[byte]
+                match = state if outputs[state] != NONE else links[state]
+                while match:
+                    rank = outputs[match]
+                    yield offset - lengths[rank], keys[rank], values[rank]
+                    match = links[match]
+
+
+def chunks(data):
+    "Iterate over chunks of data, which may be a buffer, file or iterable."
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        yield data
+    elif hasattr(data, 'readinto'):
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        size = data.readinto(buffer)
+        while size:
+            yield view[:size]
+            size = data.readinto(buffer)
+    else:
+        for chunk in data:
+            yield chunk
@@ -0,0 +1,121 @@
+"Glob patterns over bytes, matched one byte at a time while walking a Trie"
+
+BYTE_RANGE = range(256)
+
+
+def closing(data, index):
+    """Return the index of the ] closing a class starting at index, or -1.
+
+    A ] immediately after the opening [ or [! is a member of the class.
+    """
+    if data[index:index + 1] == [0x21]:
+        index += 1
+    for offset in range(index + 1, len(data)):
+        if data[offset] == 0x5d:
+            return offset
+    return -1
+
+
+def parse(pattern):
+    """Return a list of (table, star) tokens for a glob pattern.
+
+    Table is a bytearray of 256 flags marking the bytes the token matches,
+    and star is True if the token matches any number of them. As for
+    fnmatch, ``*`` matches any run of bytes, ``?`` any single byte and
+    ``[seq]`` or ``[!seq]`` any byte in or not in seq, which may hold ranges
+    like ``a-z``. A ``[`` without a closing ``]`` matches itself.
+    """
+    data = list(pattern)
+    tokens = []
+    index = 0
+    while index < len(data):
+        byte = data[index]
+        index += 1
+        if byte == 0x2a:
+            if not tokens or not tokens[-1][1]:
+                tokens.append((bytearray(b'\x01' * 256), True))
+            continue
+        table = bytearray(256)
+        close = closing(data, index) if byte == 0x5b else -1
+        if byte == 0x3f:
+            table = bytearray(b'\x01' * 256)
+        elif close >= 0:
+            negate = data[index] == 0x21
+            start = index + 1 if negate else index
+            members = data[start:close]
+            index = close + 1
+            offset = 0
+            while offset < len(members):
+                if offset + 2 < len(members) and members[offset + 1] == 0x2d:
+                    lower, upper = members[offset], members[offset + 2]
+                    offset += 3
+                else:
+                    lower = upper = members[offset]
+                    offset += 1
+                for member in range(lower, upper + 1):
+                    table[member] = 1
+            if negate:
+                table = bytearray(1 - flag for flag in table)
+        else:
+            table[byte] = 1
+        tokens.append((table, False))
+    return tokens
+
+
+class Pattern(object):
+    """Glob pattern compiled lazily into a DFA over bytes.
+
+    A state is the frozenset of tokens the input so far may have reached,
+    token len(tokens) meaning the whole pattern has matched, and the empty
+    state meaning it can no longer match. Each state is compiled the first
+    time it is reached and cached in _compiled.
+    """
+
+    def __init__(self, pattern):
+        self._tokens = parse(pattern)
+        self._compiled = {}
+        self.start = self._closure([0])
+
+    def _closure(self, positions):
+        "Return the state for positions, adding those after each star."
+        tokens = self._tokens
+        reached = set()
+        for position in positions:
+            while position not in reached:
+                reached.add(position)
+                if position == len(tokens) or not tokens[position][1]:
+                    break
+                position += 1
+        return frozenset(reached)
+
+    def compile(self, state):
+        """Return (transitions, branches, accepts) for state.
+
+        Transitions is a list of the state reached by each byte, branches
+        the bytes that reach a non-empty state in sorted order, and accepts
+        True if the pattern matches input that reached state.
+        """
+        compiled = self._compiled.get(state)
+        if compiled is not None:
+            return compiled
+        tokens = self._tokens
+        targets = [[] for _ in BYTE_RANGE]
+        for position in state:
+            if position == len(tokens):
+                continue
+            table, star = tokens[position]
+            following = position if star else position + 1
+            for byte in BYTE_RANGE:
+                if table[byte]:
+                    targets[byte].append(following)
+        closures = {}
+        transitions = []
+        for positions in targets:
+            key = frozenset(positions)
+            if key not in closures:
+                closures[key] = self._closure(positions)
+            transitions.append(closures[key])
+        branches = [byte for byte in BYTE_RANGE if transitions[byte]]
+        compiled = transitions, branches, len(tokens) in state
+        self._compiled[state] = compiled
+        return compiled
@@ -1,93 +1,404 @@
 "Trie implementation in pure Python"
-import array
-
-try:
-    # python 2.x
-    from itertools import chain, imap, repeat, tee
-    iord = lambda s: imap(ord, s)
-    char = chr
-except ImportError:
-    # python 3.x
-    from itertools import chain, repeat, tee
-    iord = iter
-    char = lambda o: bytes(chr(o), encoding='latin1')
-
-try:
-    from collections import abc
-except ImportError:
-    import collections as abc
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+import sys
+
+from collections import abc
+from itertools import compress, islice
+
+from prefixtree.pattern import Pattern
 
 STRING_TYPE = bytes
-UNICODE_TYPE = str if str is not bytes else unicode
+UNICODE_TYPE = str
+
+# Single byte strings indexed by byte value.
+char = [bytes((o,)) for o in range(256)].__getitem__
+
+# Maximum number of children held by each node layout before upgrading.
+SPARSE_CHILDREN = 16
+INDEXED_CHILDREN = 48
+
+BYTE_RANGE = range(256)
+
+# Markers used in place of a branch byte by TrieBase._iter.
+ROOT = -1
+EMIT = 256
+
+
+def branches(path, node):
+    "Iterate over (path, child) for the children of the node at path."
+    for key, child in node:
+        yield path + char(key) + child._edge, child
+
+
+def common_length(edge, path, offset):
+    "Return length of the common prefix of edge and path from offset."
+    length = 0
+    for byte in path[offset:offset + len(edge)]:
+        if byte != edge[length]:
+            break
+        length += 1
+    return length
+
+
+def trie_size(node):
+    "Return the number of bytes used by the nodes below and including node."
+    size = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        size += (sys.getsizeof(node) + sys.getsizeof(node._edge) +
+                 sys.getsizeof(node._keys) + sys.getsizeof(node._nodes))
+        stack.extend(child for _, child in node)
+    return size
+
+
+def resume(trail, previous, path):
+    """Trim trail to the nodes whose keys prefix both previous and path.
+
+    Trail holds (offset, node) pairs for the nodes on the path of previous,
+    where offset is the length of the key of the node, starting at the root.
+    Returns the last remaining pair.
+    """
+    while not path.startswith(previous[:trail[-1][0]]):
+        trail.pop()
+    return trail[-1]
+
+
+def inside(path, start, stop):
+    """Return True if every key beginning with path is within the bounds.
+
+    The bounds are those used by TrieBase._iter.
+    """
+    if path < start:
+        return False
+    return (stop is None or path.startswith(stop) or
+            path[:len(stop)] < stop and not stop.startswith(path))
+
+
+def outside(path, start, stop):
+    """Return True if no key beginning with path is within the bounds.
+
+    The bounds are those used by TrieBase._iter.
+    """
+    if path < start and not start.startswith(path):
+        return True
+    return stop is not None and path[:len(stop)] > stop
+
+
+def within(path, start, stop):
+    "Return True if path is within the bounds used by TrieBase._iter."
+    return path >= start and (stop is None or path[:len(stop)] <= stop)
+
+
+def descend(node, offset):
+    """Return (key, node, offset) for the children of a position in a trie.
+
+    The position is offset bytes into the edge of node, and the position is
+    at node itself when offset is the length of the edge. Within an edge the
+    only child is the next byte of the edge.
+    """
+    edge = node._edge
+    if offset < len(edge):
+        return [(edge[offset], node, offset + 1)]
+    return [(key, child, 0) for key, child in node]
 
 
 class Node(abc.MutableMapping):
-    "Node object for Trie"
+    """Node object for Trie.
+
+    Children are keyed by byte value and stored in a layout chosen by the
+    fan-out of the node. Every node starts out sparse, holding its branch
+    bytes in sorted order alongside a tuple of children. Nodes are upgraded
+    in place to an IndexedNode and then to a DenseNode as children are added,
+    and downgraded again as children are removed. The layouts a node moves
+    between are given by _sparse, _indexed and _dense.
+
+    The edge holds any bytes between the branch byte that leads to this node
+    and the node itself, and is only non-empty in a compressed trie. Nodes do
+    not store their key, it is rebuilt from branch bytes and edges while
+    traversing the trie.
+
+    A node is a key when its meta is not None. Only nodes for keys of a
+    dictionary have a value. Counted and weighted tries use StatsNode.
+    """
+
+    __slots__ = ('value', 'meta', '_edge', '_keys', '_nodes')
+
+    def __init__(self, edge=b''):
+        self.meta = None
+        self._edge = edge
+        self._keys = b''
+        self._nodes = ()
+
+    def __contains__(self, key):
+        return self._keys.find(key) >= 0
+
+    def __delitem__(self, key):
+        offset = self._keys.find(key)
+        if offset < 0:
+            return
+        keys, nodes = self._keys, self._nodes
+        self._keys = keys[:offset] + keys[offset + 1:]
+        self._nodes = nodes[:offset] + nodes[offset + 1:]
+
+    def __getitem__(self, key):
+        offset = self._keys.find(key)
+        return self._nodes[offset] if offset >= 0 else None
+
+    def __iter__(self):
+        return zip(self._keys, self._nodes)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __reversed__(self):
+        return zip(reversed(self._keys), reversed(self._nodes))
+
+    def __setitem__(self, key, node):
+        keys, nodes = self._keys, self._nodes
+        offset = keys.find(key)
+        if offset >= 0:
+            self._nodes = nodes[:offset] + (node,) + nodes[offset + 1:]
+        elif len(keys) < SPARSE_CHILDREN:
+            offset = bisect_left(keys, key)
+            self._keys = keys[:offset] + char(key) + keys[offset:]
+            self._nodes = nodes[:offset] + (node,) + nodes[offset:]
+        else:
+            self._morph(self._indexed)
+            self[key] = node
+
+    def _range(self, lower, upper, reverse=False):
+        "Iterate over children with branch bytes from lower to upper."
+        keys = self._keys
+        first = bisect_left(keys, lower)
+        last = bisect_right(keys, upper)
+        children = zip(keys[first:last], self._nodes[first:last])
+        return reversed(list(children)) if reverse else children
+
+    def _compact(self):
+        "Rebuild storage using the smallest layout for the current children."
+        count = len(self)
+        if count <= SPARSE_CHILDREN:
+            self._morph(self._sparse)
+        elif count <= INDEXED_CHILDREN:
+            self._morph(self._indexed)
+            self._nodes = self._nodes[:]
+        else:
+            self._morph(self._dense)
+
+    def _morph(self, layout):
+        "Change the layout of this node in place, preserving children."
+        children = list(iter(self))
+        self.__class__ = layout
+        layout._reset(self)
+        for key, node in children:
+            self[key] = node
+
+    def _reset(self):
+        self._keys = b''
+        self._nodes = ()
 
-    __slots__ = ('value', 'meta', '_branches', '_children', '_nodes', '_path')
 
-    def __init__(self, path=b''):
-        self._branches = array.array('B', repeat(0xFF, 256))
-        self._children = 0
+class IndexedNode(Node):
+    """Node with a 256 byte index into a compact list of children.
+
+    The index stores the child offset plus one, so zero marks an absent
+    branch and every byte value may have a child.
+    """
+
+    __slots__ = ()
+
+    def __contains__(self, key):
+        return self._keys[key] != 0
+
+    def __delitem__(self, key):
+        offset = self._keys[key] - 1
+        if offset < 0:
+            return
+        keys, nodes = self._keys, self._nodes
+        keys[key] = 0
+        last = nodes.pop()
+        if offset < len(nodes):
+            nodes[offset] = last
+            keys[keys.index(len(nodes) + 1)] = offset + 1
+        if len(nodes) < SPARSE_CHILDREN // 2:
+            self._morph(self._sparse)
+
+    def __getitem__(self, key):
+        offset = self._keys[key]
+        return self._nodes[offset - 1] if offset else None
+
+    def __iter__(self):
+        keys, nodes = self._keys, self._nodes
+        for key in compress(BYTE_RANGE, keys):
+            yield (key, nodes[keys[key] - 1])
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __reversed__(self):
+        keys, nodes = self._keys, self._nodes
+        for key in compress(reversed(BYTE_RANGE), reversed(keys)):
+            yield (key, nodes[keys[key] - 1])
+
+    def __setitem__(self, key, node):
+        keys, nodes = self._keys, self._nodes
+        offset = keys[key]
+        if offset:
+            nodes[offset - 1] = node
+        elif len(nodes) < INDEXED_CHILDREN:
+            nodes.append(node)
+            keys[key] = len(nodes)
+        else:
+            self._morph(self._dense)
+            self[key] = node
+
+    def _range(self, lower, upper, reverse=False):
+        keys, nodes = self._keys, self._nodes
+        if reverse:
+            present = compress(range(upper, lower - 1, -1),
+                               reversed(keys[lower:upper + 1]))
+        else:
+            present = compress(range(lower, upper + 1), keys[lower:upper + 1])
+        for key in present:
+            yield (key, nodes[keys[key] - 1])
+
+    def _reset(self):
+        self._keys = bytearray(256)
         self._nodes = []
-        self._path = path
 
-    @property
-    def path(self):
-        return self._path
+
+class DenseNode(Node):
+    """Node with a slot for every byte value.
+
+    A presence map is kept alongside the slots so that iteration can skip
+    absent branches without inspecting every slot.
+    """
+
+    __slots__ = ()
 
     def __contains__(self, key):
-        offset = self._branches[key]
-        if offset >= len(self._nodes):
-            return False
-        return self._branches[key] is not None
+        return self._keys[key] != 0
 
     def __delitem__(self, key):
-        offset = self._branches[key]
-        if offset < len(self._nodes):
-            self._nodes[offset] = None
-            self._children -= 1
+        keys = self._keys
+        if not keys[key]:
+            return
+        keys[key] = 0
+        self._nodes[key] = None
+        if keys.count(1) < INDEXED_CHILDREN * 3 // 4:
+            self._morph(self._indexed)
 
     def __getitem__(self, key):
-        offset = self._branches[key]
-        return self._nodes[offset] if offset < len(self._nodes) else None
+        return self._nodes[key]
 
     def __iter__(self):
-        for key, offset in enumerate(self._branches):
-            if offset >= len(self._nodes):
-                continue
-            node = self._nodes[offset]
-            if node is not None:
-                yield (key, node)
+        nodes = self._nodes
+        for key in compress(BYTE_RANGE, self._keys):
+            yield (key, nodes[key])
 
     def __len__(self):
-        return self._children
+        return self._keys.count(1)
 
     def __reversed__(self):
-        for key, offset in enumerate(reversed(self._branches)):
-            if offset >= len(self._nodes):
-                continue
-            node = self._nodes[offset]
-            if node is not None:
-                yield (255 - key, node)
+        nodes = self._nodes
+        for key in compress(reversed(BYTE_RANGE), reversed(self._keys)):
+            yield (key, nodes[key])
 
     def __setitem__(self, key, node):
-        current = self._branches[key]
-        if current < len(self._nodes):
-            self._nodes[current] = node
+        self._keys[key] = 1
+        self._nodes[key] = node
+
+    def _range(self, lower, upper, reverse=False):
+        keys, nodes = self._keys, self._nodes
+        if reverse:
+            present = compress(range(upper, lower - 1, -1),
+                               reversed(keys[lower:upper + 1]))
         else:
-            leaf = len(self._nodes)
-            self._nodes.append(node)
-            self._branches[key] = leaf
-            self._children += 1
+            present = compress(range(lower, upper + 1), keys[lower:upper + 1])
+        for key in present:
+            yield (key, nodes[key])
+
+    def _reset(self):
+        self._keys = bytearray(256)
+        self._nodes = [None] * 256
+
+
+class StatsNode(Node):
+    """Node that also holds statistics of the keys below it.
+
+    In a weighted dictionary _best holds the highest value of any key below
+    and including the node, otherwise it is None. In a counted trie _count
+    holds the number of keys below and including the node, otherwise it is
+    0. The slots are only added to the nodes of tries keeping either, and
+    StatsIndexedNode and StatsDenseNode are the matching layouts.
+    """
+
+    __slots__ = ('_best', '_count')
+
+    def __init__(self, edge=b''):
+        Node.__init__(self, edge)
+        self._best = None
+        self._count = 0
+
+
+class StatsIndexedNode(IndexedNode, StatsNode):
+    "IndexedNode holding statistics of the keys below it."
+
+    __slots__ = ()
+
+
+class StatsDenseNode(DenseNode, StatsNode):
+    "DenseNode holding statistics of the keys below it."
+
+    __slots__ = ()
+
+
+Node._sparse, Node._indexed, Node._dense = Node, IndexedNode, DenseNode
+StatsNode._sparse = StatsNode
+StatsNode._indexed = StatsIndexedNode
+StatsNode._dense = StatsDenseNode
 
 
 class TrieBase(object):
-    "Base class for collection classes implemented using a Trie"
+    """Base class for collection classes implemented using a Trie.
+
+    When compressed is True, runs of single child nodes are collapsed into
+    one node whose edge holds the skipped bytes. Subclasses may enable this
+    to reduce the number of nodes for long keys that share prefixes.
+
+    When finger is True, the nodes on the path of the last lookup or insert
+    are kept, and the next lookup or insert resumes from the deepest of them
+    that prefixes its key rather than from the root. Subclasses may enable
+    this when consecutive keys tend to share long prefixes. The finger is
+    dropped whenever a key is deleted.
+
+    When counted is True, every node holds the number of keys below it, so
+    that keys can be counted, ranked and selected by position in time
+    proportional to the length of the key rather than the size of the trie.
+
+    When weighted is True, values are scores and every node caches the
+    highest score below it, so that top_k only visits the nodes leading to
+    its results. Only dictionaries have values, and the cache is updated on
+    each change, so values must be numbers.
+
+    Counts and best values are held in StatsNode slots, so tries keeping
+    neither pay nothing for them.
+    """
+
+    compressed = False
+
+    counted = False
+
+    finger = False
+
+    weighted = False
 
     def __init__(self):
-        self._root = Node()
+        self._root = self._node()
         self._values = 0
+        self._drop_finger()
 
     def __iter__(self):
         return self._iter_keys(self._root)
@@ -98,72 +409,916 @@ class TrieBase(object):
     def __reversed__(self):
         return self._iter_keys(self._root, reverse=True)
 
-    def _delete(self, keys, node):
-        try:
-            index = next(keys)
+    def _adopt(self, path, node, count):
+        """Graft node, holding count keys beginning with path, into this trie.
+
+        The trie must be empty. Nodes are added for path above node, with the
+        count and best value of node, or in a compressed trie the edge of
+        node is set to hold it.
+        """
+        self._values = count
+        if not path:
+            self._root = node
+        elif self.compressed:
+            node._edge = path[1:]
+            self._root[path[0]] = node
+        else:
+            parent = self._root
+            for offset in range(len(path) - 1):
+                child = self._node()
+                if self.counted or self.weighted:
+                    child._count, child._best = node._count, node._best
+                parent[path[offset]] = child
+                parent = child
+            parent[path[-1]] = node
+        if self.counted or self.weighted:
+            self._root._count, self._root._best = node._count, node._best
+        self._drop_finger()
+
+    def _backtrack(self, path, trail, below):
+        """Return (path, node) for the key nearest to path from a trail.
+
+        Trail holds (offset, node) pairs for nodes whose keys prefix path.
+        The children of each node on the side of path given by below are
+        tried from the deepest node up, and when below is True so is the node
+        itself. Returns (path, None) if there is no such key.
+        """
+        while trail:
+            depth, node = trail.pop()
+            byte = path[depth]
+            if below:
+                for key, child in node._range(0, byte - 1, reverse=True):
+                    return self._rightmost(
+                        path[:depth] + char(key) + child._edge, child)
+                if node.meta is not None:
+                    return path[:depth], node
+            else:
+                for key, child in node._range(byte + 1, 255):
+                    return self._leftmost(
+                        path[:depth] + char(key) + child._edge, child)
+        return path, None
+
+    def _compact(self, root):
+        """Compact every node below root, returning the bytes reclaimed.
+
+        In a compressed trie any runs of single child nodes are also merged.
+        """
+        self._drop_finger()
+        size = trie_size(root)
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for key, child in list(node):
+                if self.compressed:
+                    edge = child._edge
+                    while child.meta is None and len(child) == 1:
+                        for branch, child in child:
+                            edge += char(branch) + child._edge
+                    if child is not node[key]:
+                        child._edge = edge
+                        node[key] = child
+                stack.append(child)
+            node._compact()
+        return size - trie_size(root)
+
+    def _copy(self, node, offset=0):
+        """Return a copy of the keys below node, and the number of keys.
+
+        The copy starts offset bytes into the edge of node. Only the keys
+        and their metas are copied.
+        """
+        copy = self._node(node._edge[offset:])
+        count = 0
+        stack = [(copy, node)]
+        while stack:
+            target, source = stack.pop()
+            if source.meta is not None:
+                target.meta = source.meta
+                count += 1
+            for key, child in source:
+                branch = self._node(child._edge)
+                target[key] = branch
+                stack.append((branch, child))
+        return copy, count
+
+    def _count(self, node):
+        "Return the number of keys below and including node."
+        if self.counted:
+            return node._count
+        return sum(1 for _, child in self._iter(node)
+                   if child.meta is not None)
+
+    def _delete(self, path, node, offset=0):
+        self._drop_finger()
+        trail = []
+        length = len(path)
+        while offset < length:
+            index = path[offset]
             child = node[index]
-            if child is None:
+            if child is None or not path.startswith(child._edge, offset + 1):
                 raise AttributeError(index)
-            leaf = self._delete(keys, child)
-            if len(child) == 0:
-                del node[index]
-            return leaf
-        except StopIteration:
-            return node
-
-    def _insert(self, keys, node):
-        try:
-            index = next(keys)
+            trail.append((node, index))
+            offset += 1 + len(child._edge)
+            node = child
+        leaf = node
+        if leaf.meta is None:
+            raise AttributeError(path)
+        leaf.value = leaf.meta = None
+        self._prune(trail, leaf)
+        return leaf
+
+    def _delete_range(self, start=b'', stop=None):
+        """Remove the keys between start and stop, returning how many.
+
+        The bounds are those used by _iter. Children whose keys all lie
+        within the bounds are unlinked whole, and only the nodes on the
+        boundaries of the range are visited. The visited nodes are then
+        pruned, merged, and their counts and best values recomputed,
+        deepest first.
+        """
+        self._drop_finger()
+        removed = 0
+        visited = []
+        stack = [(None, None, self._root, b'')]
+        while stack:
+            parent, index, node, path = stack.pop()
+            visited.append((parent, index, node))
+            if node.meta is not None and within(path, start, stop):
+                node.value = node.meta = None
+                removed += 1
+            for key, child in list(node):
+                branch = path + char(key) + child._edge
+                if outside(branch, start, stop):
+                    continue
+                if inside(branch, start, stop):
+                    del node[key]
+                    removed += self._count(child)
+                else:
+                    stack.append((node, key, child, branch))
+        for parent, index, node in reversed(visited):
+            if parent is not None and node.meta is None and len(node) < 2:
+                if not len(node):
+                    del parent[index]
+                    continue
+                if self.compressed:
+                    for key, child in node:
+                        child._edge = node._edge + char(key) + child._edge
+                        parent[index] = child
+                    continue
+            self._refresh(node)
+        self._values -= removed
+        return removed
+
+    def _detach(self, path):
+        """Unlink the subtree holding the keys beginning with path.
+
+        Returns (path, node, count) for the root of the subtree, as for
+        _subtree, and the number of keys in it. Node is None if no key
+        begins with path. The number of keys, and the counts and best values
+        of the nodes above the subtree, are updated.
+        """
+        self._drop_finger()
+        found, node = self._subtree(path)
+        if node is None:
+            return found, None, 0
+        count = self._count(node)
+        if node is self._root:
+            self._root = self._node()
+            self._drop_finger()
+        else:
+            trail = []
+            parent = self._root
+            offset = 0
+            while offset < len(found):
+                index = found[offset]
+                trail.append((parent, index))
+                parent = parent[index]
+                offset += 1 + len(parent._edge)
+            parent, index = trail.pop()
+            del parent[index]
+            if self.counted:
+                for ancestor, _ in trail:
+                    ancestor._count -= count
+                parent._count -= count
+            self._prune(trail, parent)
+            if self.weighted:
+                self._reweigh(found)
+        self._values -= count
+        return found, node, count
+
+    def _drop_finger(self):
+        "Reset the finger to the root."
+        self._finger = [(0, self._root)]
+        self._finger_path = b''
+
+    def _find(self, path):
+        """Return the node for path, raising AttributeError if absent.
+
+        Searches from the finger if it is enabled, otherwise from the root.
+        """
+        if not self.finger:
+            return self._search(path, self._root)
+        node, offset = self._resume(path)
+        return self._search(path, node, offset=offset, trail=self._finger)
+
+    def _fuzzy(self, target, max_distance):
+        """Iterate over (path, node, distance) for keys near target.
+
+        Distance is the Levenshtein distance between the path and target.
+        Nodes are visited in key order with an explicit stack holding the
+        row of distances from the path to each prefix of target, and
+        children are skipped once every entry of the row exceeds
+        max_distance. The path is a shared buffer, as for _iter.
+        """
+        targets = list(enumerate(target, 1))
+        path = bytearray()
+        row = list(range(len(target) + 1))
+        if self._root.meta is not None and row[-1] <= max_distance:
+            yield path, self._root, row[-1]
+        stack = [(0, key, child, row) for key, child in reversed(self._root)]
+        while stack:
+            depth, key, node, row = stack.pop()
+            del path[depth:]
+            path.append(key)
+            path += node._edge
+            for byte in path[depth:]:
+                previous, row = row, [row[0] + 1]
+                for index, other in targets:
+                    row.append(min(previous[index] + 1, row[index - 1] + 1,
+                                   previous[index - 1] + (byte != other)))
+                if min(row) > max_distance:
+                    break
+            else:
+                if node.meta is not None and row[-1] <= max_distance:
+                    yield path, node, row[-1]
+                depth = len(path)
+                for key, child in reversed(node):
+                    stack.append((depth, key, child, row))
+
+    def _glob(self, pattern):
+        """Iterate over (path, node) pairs for keys matching pattern.
+
+        Pattern is a Pattern, compiled for each state reached while walking
+        the trie in key order. Only children whose branch byte leads to a
+        live state are visited, found by lookup when the state has fewer
+        branches than the node has children. The path is a shared buffer,
+        as for _iter.
+        """
+        compile = pattern.compile
+        path = bytearray()
+        stack = [(0, ROOT, self._root, pattern.start)]
+        while stack:
+            depth, key, node, state = stack.pop()
+            del path[depth:]
+            if key != ROOT:
+                path.append(key)
+                edge = node._edge
+                if edge:
+                    for byte in edge:
+                        state = compile(state)[0][byte]
+                        if not state:
+                            break
+                    if not state:
+                        continue
+                    path += edge
+                depth = len(path)
+            transitions, branches, accepts = compile(state)
+            if accepts and node.meta is not None:
+                yield path, node
+            if len(branches) < len(node):
+                children = [(key, node[key]) for key in reversed(branches)]
+            else:
+                children = reversed(node)
+            for key, child in children:
+                if child is not None and transitions[key]:
+                    stack.append((depth, key, child, transitions[key]))
+
+    def _insert(self, path, node, offset=0, trail=None):
+        """Return the node for path, creating any missing nodes.
+
+        If trail is a list, (offset, node) is appended to it for each node
+        passed through, where offset is the length of the key of the node.
+        """
+        length = len(path)
+        while offset < length:
+            index = path[offset]
             child = node[index]
+            offset += 1
             if child is None:
-                child = Node(node.path + char(index))
+                if self.compressed:
+                    child = self._node(path[offset:])
+                    node[index] = child
+                    if trail is not None:
+                        trail.append((length, child))
+                    return child
+                child = self._node()
                 node[index] = child
-            return self._insert(keys, child)
-        except StopIteration:
-            return node
-
-    def _iter(self, node, start=tuple(), stop=tuple(), reverse=False):
-        start = chain(start, repeat(-1))
-        stop = chain(stop, repeat(256))
-        direction = iter if not reverse else reversed
-        for node in self._walk(node, start, stop, iterate=direction):
-            yield node
-
-    def _iter_keys(self, node, start=tuple(), stop=tuple(), reverse=False):
-        for node in self._iter(node, start, stop, reverse):
-            if not hasattr(node, 'value'):
+            elif child._edge:
+                edge = child._edge
+                if not path.startswith(edge, offset):
+                    common = common_length(edge, path, offset)
+                    middle = self._node(edge[:common])
+                    middle[edge[common]] = child
+                    if self.counted or self.weighted:
+                        middle._best = child._best
+                        middle._count = child._count
+                    child._edge = edge[common + 1:]
+                    node[index] = middle
+                    child = middle
+                offset += len(child._edge)
+            node = child
+            if trail is not None:
+                trail.append((offset, node))
+        return node
+
+    def _insert_sorted(self, items):
+        """Insert keys of (key, value) items given in sorted order.
+
+        Yields (node, meta, value) for each item. Each key is inserted from
+        the deepest node it shares with the previous key. Raises ValueError
+        if a key sorts before the previous key.
+        """
+        trail = [(0, self._root)]
+        previous = b''
+        for key, value in items:
+            path, meta = self.prepare_key(key)
+            if path < previous:
+                raise ValueError("keys must be sorted")
+            offset, node = resume(trail, previous, path)
+            previous = path
+            yield self._insert(path, node, offset, trail), meta, value
+
+    def _iter(self, node, start=b'', stop=None, reverse=False):
+        """Iterate over (path, node) pairs within the start and stop bounds.
+
+        Nodes are visited in key order, or reverse key order, using an
+        explicit stack. A node's path must be at least start, and the prefix
+        of its path with the length of stop must be at most stop. Children
+        outside of the bounds are skipped without being visited.
+
+        The path is a buffer shared by the whole traversal, copy it before
+        advancing the iterator if it needs to be kept.
+        """
+        path = bytearray()
+        stack = [(0, ROOT, node, bool(start), bool(stop))]
+        while stack:
+            depth, key, node, low, high = stack.pop()
+            del path[depth:]
+            if key == EMIT:
+                yield path, node
                 continue
-            yield self.restore_key(node.path, node.meta)
+            if key != ROOT:
+                path.append(key)
+                depth += 1
+            edge = node._edge
+            if edge:
+                path += edge
+                if low:
+                    bound = start[depth:depth + len(edge)]
+                    if edge[:len(bound)] < bound:
+                        continue
+                    low = edge[:len(bound)] == bound
+                if high:
+                    bound = stop[depth:depth + len(edge)]
+                    if edge[:len(bound)] > bound:
+                        continue
+                    high = edge[:len(bound)] == bound
+                depth += len(edge)
+            if low and depth >= len(start):
+                low = False
+            if high and depth >= len(stop):
+                high = False
+            if not low:
+                if not reverse:
+                    yield path, node
+                else:
+                    stack.append((depth, EMIT, node, False, False))
+            if low or high:
+                lower = start[depth] if low else 0
+                upper = stop[depth] if high else 255
+                for key, child in node._range(lower, upper, not reverse):
+                    stack.append((depth, key, child,
+                                  low and key == lower,
+                                  high and key == upper))
+            else:
+                for key, child in (iter(node) if reverse else reversed(node)):
+                    stack.append((depth, key, child, False, False))
+
+    def _iter_keys(self, node, start=b'', stop=None, reverse=False):
+        for path, node in self._iter(node, start, stop, reverse):
+            if node.meta is not None:
+                yield self.restore_key(bytes(path), node.meta)
+
+    def _iter_values(self, node, start=b'', stop=None, reverse=False):
+        for path, node in self._iter(node, start, stop, reverse):
+            if node.meta is not None:
+                yield node.value
+
+    def _leftmost(self, path, node):
+        """Return (path, node) for the least key below and including node.
 
-    def _iter_values(self, node, start=tuple(), stop=tuple(), reverse=False):
-        for node in self._iter(node, start, stop, reverse):
-            if not hasattr(node, 'value'):
+        Follows the first child of each node, the node must have keys.
+        """
+        while node.meta is None:
+            key, node = next(iter(node))
+            path += char(key) + node._edge
+        return path, node
+
+    def _list_dir(self, path, delimiter, after):
+        """Iterate over (path, node) for the entries below path, in order.
+
+        Keys whose remainder after path holds no delimiter are entries with
+        their node. For the others the key up to the end of the first
+        delimiter is an entry with a node of None, and the subtree below it
+        is skipped. Entries must be after after, unless it is None.
+        """
+        found, node = self._subtree(path)
+        if node is None:
+            return
+        stack = [(len(path), iter([(found, node)]))]
+        while stack:
+            start, children = stack[-1]
+            for found, node in children:
+                break
+            else:
+                stack.pop()
                 continue
-            yield node.value
+            if after is not None and outside(found, after, None):
+                continue
+            if delimiter:
+                index = found.find(delimiter, start)
+                if index >= 0:
+                    common = found[:index + len(delimiter)]
+                    if after is None or common > after:
+                        yield common, None
+                    continue
+            if node.meta is not None and (after is None or found > after):
+                yield found, node
+            start = max(len(found) - len(delimiter) + 1, len(path))
+            stack.append((start, branches(found, node)))
+
+    def _match(self, path, node, offset=0):
+        """Find the deepest node whose key is a prefix of path.
+
+        Returns the node and the length of its key.
+        """
+        length = len(path)
+        while offset < length:
+            index = path[offset]
+            keys = node._keys
+            if keys.__class__ is bytes:
+                if len(keys) == 1:
+                    if index not in keys:
+                        break
+                    child = node._nodes[0]
+                else:
+                    slot = keys.find(index)
+                    if slot < 0:
+                        break
+                    child = node._nodes[slot]
+            else:
+                nodes = node._nodes
+                if len(nodes) == 256:
+                    child = nodes[index]
+                    if child is None:
+                        break
+                else:
+                    slot = keys[index]
+                    if not slot:
+                        break
+                    child = nodes[slot - 1]
+            edge = child._edge
+            if edge and not path.startswith(edge, offset + 1):
+                break
+            offset += 1 + len(edge)
+            node = child
+        return node, offset
+
+    def _merge(self, other, left, right, both):
+        """Return the root and number of keys of a trie combining two tries.
+
+        Keys only in this trie are kept if left is True, keys only in other
+        if right is True and keys in both if both is True. The tries are
+        walked together, and a subtree present in only one of them is either
+        copied whole or skipped without being visited. Both tries must have
+        the same compressed setting; the new trie is uncompressed apart from
+        the edges of copied subtrees.
+        """
+        root = self._node()
+        created = []
+        count = 0
+        stack = [(root, self._root, 0, other._root, 0)]
+        while stack:
+            target, mine, i, theirs, j = stack.pop()
+            in_mine = i == len(mine._edge) and mine.meta is not None
+            in_theirs = j == len(theirs._edge) and theirs.meta is not None
+            if in_mine and in_theirs and both:
+                target.meta = mine.meta
+                count += 1
+            elif (in_mine and not in_theirs and left or
+                  in_theirs and not in_mine and right):
+                target.meta = mine.meta if in_mine else theirs.meta
+                count += 1
+            branches = dict((key, (child, k))
+                            for key, child, k in descend(theirs, j))
+            for key, child, k in descend(mine, i):
+                if key in branches:
+                    branch = self._node()
+                    target[key] = branch
+                    created.append((target, key, branch))
+                    stack.append((branch, child, k) + branches.pop(key))
+                elif left:
+                    target[key], copied = self._copy(child, k)
+                    count += copied
+            if right:
+                for key, (child, k) in branches.items():
+                    target[key], copied = self._copy(child, k)
+                    count += copied
+        for parent, key, node in reversed(created):
+            if node.meta is None and not len(node):
+                del parent[key]
+        return root, count
+
+    def _nearest(self, path, below, inclusive):
+        """Return (path, node) for the key nearest to path.
+
+        This is the greatest key before path when below is True, otherwise
+        the least key after it, or path itself if it is a key and inclusive
+        is True. Descends along path once, then backtracks through the nodes
+        passed. Returns (path, None) if there is no such key.
+        """
+        trail = [(0, self._root)]
+        depth, node = trail[0]
+        while depth < len(path):
+            child = node[path[depth]]
+            if child is None:
+                break
+            edge = child._edge
+            segment = path[depth + 1:depth + 1 + len(edge)]
+            if segment != edge:
+                if (segment > edge) == below:
+                    found = path[:depth + 1] + edge
+                    if below:
+                        return self._rightmost(found, child)
+                    return self._leftmost(found, child)
+                break
+            depth += 1 + len(edge)
+            node = child
+            trail.append((depth, node))
+        else:
+            if inclusive and node.meta is not None:
+                return path, node
+            if not below and len(node):
+                key, child = next(iter(node))
+                return self._leftmost(path + char(key) + child._edge, child)
+            trail.pop()
+        return self._backtrack(path, trail, below)
+
+    def _neighbour(self, key, below, inclusive):
+        """Return (key, node) for the key nearest to key, as for _nearest.
+
+        Raises KeyError if there is no such key.
+        """
+        path, _ = self.prepare_key(key)
+        found, node = self._nearest(path, below, inclusive)
+        if node is None:
+            raise KeyError(key)
+        return self.restore_key(found, node.meta), node
+
+    def _node(self, edge=b''):
+        "Return a new node, a StatsNode if the trie is counted or weighted."
+        if self.counted or self.weighted:
+            return StatsNode(edge)
+        return Node(edge)
 
-    def _search(self, keys, node, exact=True):
+    def _overlaps(self, other):
+        """Return True if this trie and other share a key.
+
+        Only the branches present in both tries are walked, as for _merge.
+        """
+        stack = [(self._root, 0, other._root, 0)]
+        while stack:
+            mine, i, theirs, j = stack.pop()
+            if (i == len(mine._edge) and mine.meta is not None and
+                    j == len(theirs._edge) and theirs.meta is not None):
+                return True
+            branches = dict((key, (child, k))
+                            for key, child, k in descend(theirs, j))
+            for key, child, k in descend(mine, i):
+                if key in branches:
+                    stack.append((child, k) + branches[key])
+        return False
+
+    def _prefixes(self, path):
+        """Return (length, node) for each key that prefixes path.
+
+        The keys are found in a single search for path and are returned
+        shortest first.
+        """
+        trail = [(0, self._root)]
         try:
-            index = next(keys)
+            self._search(path, self._root, trail=trail)
+        except AttributeError:
+            pass
+        return [(offset, node) for offset, node in trail
+                if node.meta is not None]
+
+    def _prune(self, trail, node):
+        """Remove node if it is left without keys, and then its ancestors.
+
+        Trail holds (parent, index) for each node above node, starting at
+        the root. In a compressed trie the first remaining node that is not
+        a key and has a single child is merged with the child.
+        """
+        for parent, index in reversed(trail):
+            if node.meta is not None:
+                break
+            if len(node) == 0:
+                del parent[index]
+            elif len(node) == 1 and self.compressed:
+                for key, child in node:
+                    child._edge = node._edge + char(key) + child._edge
+                    parent[index] = child
+                break
+            else:
+                break
+            node = parent
+
+    def _rank(self, path):
+        """Return the number of keys that sort before path.
+
+        Counts the keys of the nodes that prefix path and of the children
+        that branch off before it, using the count held by each child.
+        """
+        rank = 0
+        node = self._root
+        offset = 0
+        while offset < len(path):
+            if node.meta is not None:
+                rank += 1
+            index = path[offset]
+            for _, child in node._range(0, index - 1):
+                rank += child._count
             child = node[index]
-            if child is None and exact:
-                raise AttributeError(index)
-            elif child is None:
-                return node
-            return self._search(keys, child, exact)
-        except StopIteration:
-            return node
-
-    def _walk(self, root, start, stop, lower=-1, upper=256, iterate=iter):
-        current = ord(root.path[-1:]) if len(root.path) > 0 else -1
-        if not lower <= current <= upper:
-            raise StopIteration
-        yield root
-        lower = next(start)
-        upper = next(stop)
-        for key, child in iterate(root):
-            for descendant in self._walk(child, start, stop,
-                                        lower, upper, iterate):
-                yield descendant
+            if child is None:
+                break
+            edge = child._edge
+            offset += 1
+            if not path.startswith(edge, offset):
+                if edge < path[offset:offset + len(edge)]:
+                    rank += child._count
+                break
+            offset += len(edge)
+            node = child
+        return rank
+
+    def _recount(self, path, delta):
+        "Add delta to the count of the nodes whose keys prefix path."
+        trail = [(0, self._root)]
+        try:
+            self._search(path, self._root, trail=trail)
+        except AttributeError:
+            pass
+        for _, node in trail:
+            node._count += delta
+
+    def _resume(self, path):
+        """Return the deepest node of the finger that prefixes path.
+
+        Returns the node and the length of its key. The finger is trimmed to
+        that node and then follows path.
+        """
+        offset, node = resume(self._finger, self._finger_path, path)
+        self._finger_path = path
+        return node, offset
+
+    def _reweigh(self, path, raised=False):
+        """Recompute the best value of the nodes on path, deepest first.
+
+        Stops at the first node whose best value is unchanged, as the nodes
+        above it are then unchanged too. Path need not be a key, the nodes
+        for its longest prefix in the trie are recomputed. If raised is True
+        the value at path was added or increased, so each node only needs
+        comparing with it rather than with all of its children.
+        """
+        trail = [(0, self._root)]
+        try:
+            self._search(path, self._root, trail=trail)
+        except AttributeError:
+            pass
+        if raised:
+            value = trail[-1][1].value
+            for _, node in reversed(trail):
+                if node._best is not None and node._best >= value:
+                    break
+                node._best = value
+            return
+        for _, node in reversed(trail):
+            best = node._best
+            self._refresh(node)
+            if node._best == best:
+                break
+
+    def _rightmost(self, path, node):
+        """Return (path, node) for the greatest key below and including node.
+
+        Follows the last child of each node, the node must have keys.
+        """
+        while len(node):
+            key, node = next(reversed(node))
+            path += char(key) + node._edge
+        return path, node
+
+    def _same_keys(self, other):
+        """Return True if this trie and other hold the same keys.
+
+        Tries with the same compressed setting holding the same keys have the
+        same shape, as deletes remove nodes left without keys below them, so
+        the tries are compared node by node.
+        """
+        if len(self) != len(other):
+            return False
+        stack = [(self._root, other._root)]
+        while stack:
+            mine, theirs = stack.pop()
+            if ((mine.meta is None) != (theirs.meta is None) or
+                    mine._edge != theirs._edge or len(mine) != len(theirs)):
+                return False
+            for (key, child), (other_key, other_child) in zip(mine, theirs):
+                if key != other_key:
+                    return False
+                stack.append((child, other_child))
+        return True
+
+    def _search(self, path, node, exact=True, offset=0, trail=None):
+        """Return the node for path, raising AttributeError if absent.
+
+        If trail is a list, (offset, node) is appended to it for each node
+        passed through, as for _insert.
+
+        The child lookup of each layout is inlined rather than going through
+        Node.__getitem__: a sparse node has its branch bytes in a bytes
+        object, an indexed node has a bytearray of offsets plus one into its
+        children, and a dense node has 256 slots. A sparse node with one
+        child, the usual case deep in a trie, is checked without a method
+        call. _match does the same.
+        """
+        if not exact:
+            return self._match(path, node, offset)[0]
+        length = len(path)
+        while offset < length:
+            index = path[offset]
+            keys = node._keys
+            if keys.__class__ is bytes:
+                if len(keys) == 1:
+                    if index not in keys:
+                        raise AttributeError(index)
+                    node = node._nodes[0]
+                else:
+                    slot = keys.find(index)
+                    if slot < 0:
+                        raise AttributeError(index)
+                    node = node._nodes[slot]
+            else:
+                nodes = node._nodes
+                if len(nodes) == 256:
+                    node = nodes[index]
+                    if node is None:
+                        raise AttributeError(index)
+                else:
+                    slot = keys[index]
+                    if not slot:
+                        raise AttributeError(index)
+                    node = nodes[slot - 1]
+            edge = node._edge
+            offset += 1
+            if edge:
+                if not path.startswith(edge, offset):
+                    raise AttributeError(index)
+                offset += len(edge)
+            if trail is not None:
+                trail.append((offset, node))
+        return node
+
+    def _search_many(self, paths):
+        """Return the node for each path, or None if absent, in input order.
+
+        Paths are searched in sorted order, each resuming from the deepest
+        node it shares with the previous path.
+        """
+        nodes = [None] * len(paths)
+        trail = [(0, self._root)]
+        previous = b''
+        for index in sorted(range(len(paths)), key=paths.__getitem__):
+            path = paths[index]
+            offset, node = resume(trail, previous, path)
+            previous = path
+            try:
+                nodes[index] = self._search(path, node, offset=offset,
+                                            trail=trail)
+            except AttributeError:
+                pass
+        return nodes
+
+    def _select(self, index):
+        """Return (path, node) for the key at index in sorted order.
+
+        Descends from the root into the child holding the key, skipping the
+        children before it by their counts. Index must be in range.
+        """
+        path = b''
+        node = self._root
+        while True:
+            if node.meta is not None:
+                if not index:
+                    return path, node
+                index -= 1
+            for key, child in node:
+                if index < child._count:
+                    break
+                index -= child._count
+            path += char(key) + child._edge
+            node = child
+
+    def _store(self, path):
+        """Return the node for path, creating any missing nodes.
+
+        Inserts from the finger if it is enabled, otherwise from the root.
+        """
+        if not self.finger:
+            return self._insert(path, self._root)
+        node, offset = self._resume(path)
+        return self._insert(path, node, offset, self._finger)
+
+    def _subtree(self, path):
+        """Return (path, node) for the root of the keys beginning with path.
+
+        The node is the node for path, or the node whose edge extends it, in
+        which case the returned path includes the edge. Returns (path, None)
+        if no key begins with path.
+        """
+        node, depth = self._match(path, self._root)
+        if depth < len(path):
+            node = node[path[depth]]
+            if node is None or not node._edge.startswith(path[depth + 1:]):
+                return path, None
+            path = path[:depth + 1] + node._edge
+        return path, node
+
+    def _top(self, path, count):
+        """Return (path, node) for the count highest valued keys below path.
+
+        Searches best first from the node found by _subtree, using the best
+        values cached on each node. Only nodes
+        whose best value may still be among the results are expanded. Ties
+        are returned in key order.
+        """
+        path, node = self._subtree(path)
+        if node is None or node._best is None:
+            return []
+        found = []
+        heap = [(-node._best, path, True, node)]
+        while heap and len(found) < count:
+            _, path, expand, node = heappop(heap)
+            if not expand:
+                found.append((path, node))
+                continue
+            if node.meta is not None:
+                heappush(heap, (-node.value, path, False, node))
+            for key, child in node:
+                if child._best is not None:
+                    branch = path + char(key) + child._edge
+                    heappush(heap, (-child._best, branch, True, child))
+        return found
+
+    def _recompute(self, root):
+        "Recompute the count and best value of every node below root."
+        stack = [(False, root)]
+        while stack:
+            visited, node = stack.pop()
+            if not visited:
+                stack.append((True, node))
+                stack.extend((False, child) for _, child in node)
+            else:
+                self._refresh(node)
+
+    def _refresh(self, node):
+        """Recompute the count and best value of node from its children.
+
+        Only the values kept by the trie, as set by counted and weighted,
+        are recomputed.
+        """
+        if self.counted:
+            node._count = sum(child._count for _, child in node)
+            if node.meta is not None:
+                node._count += 1
+        if self.weighted:
+            best = node.value if node.meta is not None else None
+            for _, child in node:
+                if best is None or (child._best is not None and
+                                    child._best > best):
+                    best = child._best
+            node._best = best
 
     def prepare_key(self, key):
         """Prepare key for use by Trie.
@@ -187,16 +1342,198 @@ class TrieBase(object):
         """
         return key.decode('UTF-8') if encoded else key
 
+    def compact(self):
+        """Rebuild the storage of every node, returning the bytes reclaimed.
+
+        Each node is given the smallest layout for its number of children.
+        """
+        return self._compact(self._root)
+
     def commonprefix(self, key, restore_key=True):
         "Return longest common prefix between key and current keys."
         path, _ = self.prepare_key(key)
-        node = self._search(iord(path), self._root, exact=False)
-        if hasattr(node, 'value') and restore_key:
-            return self.restore_key(node.path, node.meta)
-        return node.path
+        node, depth = self._match(path, self._root)
+        child = node[path[depth]] if depth < len(path) else None
+        if child is not None:
+            depth += 1 + common_length(child._edge, path, depth + 1)
+        elif node.meta is not None and restore_key:
+            return self.restore_key(path[:depth], node.meta)
+        return path[:depth]
+
+    def contains_many(self, keys):
+        """Return a list of whether each key is present, in input order.
+
+        The keys are looked up in sorted order, sharing the walk from the
+        root between keys with common prefixes.
+        """
+        paths = [self.prepare_key(key)[0] for key in keys]
+        return [node is not None and node.meta is not None
+                for node in self._search_many(paths)]
+
+    def count_prefix(self, prefix):
+        "Return the number of keys beginning with prefix."
+        path, _ = self.prepare_key(prefix)
+        if not self.counted:
+            return sum(1 for _, node in self._iter(self._root, path, path)
+                       if node.meta is not None)
+        _, node = self._subtree(path)
+        return node._count if node is not None else 0
+
+    def count_range(self, start=None, stop=None):
+        """Return the number of keys from start to stop.
+
+        The bounds are those of a slice, so keys beginning with stop are
+        counted and either bound may be None.
+        """
+        lower = self.rank(start) if start is not None else 0
+        if stop is None:
+            upper = len(self)
+        else:
+            upper = self.rank(stop) + self.count_prefix(stop)
+        return max(upper - lower, 0)
+
+    def delete_prefix(self, prefix):
+        """Remove all keys beginning with prefix, returning how many.
+
+        The subtree holding the keys is unlinked in one operation.
+        """
+        path, _ = self.prepare_key(prefix)
+        return self._detach(path)[2]
+
+    def ceiling(self, key):
+        """Return the least key greater than or equal to key.
+
+        Raises KeyError if there is no such key.
+        """
+        return self._neighbour(key, False, True)[0]
+
+    def floor(self, key):
+        """Return the greatest key less than or equal to key.
+
+        Raises KeyError if there is no such key.
+        """
+        return self._neighbour(key, True, True)[0]
+
+    def higher(self, key):
+        """Return the least key greater than key.
+
+        Raises KeyError if there is no such key.
+        """
+        return self._neighbour(key, False, False)[0]
+
+    def lower(self, key):
+        """Return the greatest key less than key.
+
+        Raises KeyError if there is no such key.
+        """
+        return self._neighbour(key, True, False)[0]
+
+    def list_dir(self, prefix, delimiter=b'/', limit=None, start_after=None):
+        """Return (keys, prefixes) for one level of keys below prefix.
+
+        Keys beginning with prefix whose remainder holds no delimiter are
+        returned in keys. The others are collapsed into the prefix up to
+        the end of the first delimiter, returned once in prefixes, without
+        visiting the keys below it. If delimiter is empty or None every key
+        beginning with prefix is returned. At most limit entries are
+        returned, and only those after start_after, so a listing is
+        continued by passing its greatest entry.
+        """
+        path, encoded = self.prepare_key(prefix)
+        delimiter = self.prepare_key(delimiter)[0] if delimiter else b''
+        if start_after is not None:
+            start_after, _ = self.prepare_key(start_after)
+        keys, prefixes = [], []
+        entries = self._list_dir(path, delimiter, start_after)
+        for found, node in islice(entries, limit):
+            if node is None:
+                prefixes.append(self.restore_key(found, encoded))
+            else:
+                keys.append(self.restore_key(found, node.meta))
+        return keys, prefixes
+
+    def max(self):
+        "Return the greatest key, raising ValueError if there are no keys."
+        if not self._values:
+            raise ValueError("max() of an empty trie")
+        found, node = self._rightmost(b'', self._root)
+        return self.restore_key(found, node.meta)
+
+    def min(self):
+        "Return the least key, raising ValueError if there are no keys."
+        if not self._values:
+            raise ValueError("min() of an empty trie")
+        found, node = self._leftmost(b'', self._root)
+        return self.restore_key(found, node.meta)
+
+    def fuzzy(self, key, max_distance):
+        """Iterate over (key, distance) for keys within max_distance of key.
+
+        Distance is the Levenshtein distance between the encoded keys. Keys
+        are returned in order.
+        """
+        path, _ = self.prepare_key(key)
+        for found, node, distance in self._fuzzy(path, max_distance):
+            yield self.restore_key(bytes(found), node.meta), distance
+
+    def match(self, pattern):
+        """Iterate over all keys matching a glob pattern, in order.
+
+        As for fnmatch, the pattern may hold ``*``, ``?`` and ``[seq]``, and
+        is matched against the encoded keys a byte at a time.
+        """
+        path, _ = self.prepare_key(pattern)
+        for found, node in self._glob(Pattern(path)):
+            yield self.restore_key(bytes(found), node.meta)
+
+    def iter_prefixes(self, key):
+        "Iterate over all keys that are a prefix of key, shortest first."
+        path, _ = self.prepare_key(key)
+        for offset, node in self._prefixes(path):
+            yield self.restore_key(path[:offset], node.meta)
+
+    def pop_prefix(self, prefix):
+        """Remove all keys beginning with prefix and return them.
+
+        The keys are returned in a new trie of the same class, which takes
+        over the subtree holding them rather than copying it.
+        """
+        path, _ = self.prepare_key(prefix)
+        found, node, count = self._detach(path)
+        popped = self.__class__()
+        if node is not None:
+            popped._adopt(found, node, count)
+        return popped
+
+    def rank(self, key):
+        "Return the number of keys that sort before key."
+        path, _ = self.prepare_key(key)
+        if not self.counted:
+            rank = 0
+            for found, node in self._iter(self._root, b'', path):
+                if node.meta is not None:
+                    if found >= path:
+                        break
+                    rank += 1
+            return rank
+        return self._rank(path)
+
+    def select(self, index):
+        """Return the key at index in sorted order.
+
+        Negative indexes count from the end. Raises IndexError if index is
+        out of range.
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("index out of range")
+        if not self.counted:
+            return next(islice(self, index, None))
+        path, node = self._select(index)
+        return self.restore_key(path, node.meta)
 
     def startswith(self, base, reverse=False):
         "Iterate over all keys with matching prefix."
         path, _ = self.prepare_key(base)
-        start, stop = tee(iord(path))
-        return self._iter_keys(self._root, start, stop, reverse)
+        return self._iter_keys(self._root, path, path, reverse)
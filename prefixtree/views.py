@@ -0,0 +1,95 @@
+"Views of the keys, values and items of a PrefixDict"
+from collections import abc
+
+from prefixtree.trie import within
+
+
+class TrieView(abc.MappingView):
+    """Base class for views of the keys of a trie within bounds.
+
+    The bounds are those used by TrieBase._iter, and the view holds every
+    key when start is empty and stop is None. Iteration walks the trie once,
+    reading each key and value from its node, and may be reversed.
+    """
+
+    __slots__ = ('_start', '_stop')
+
+    def __init__(self, mapping, start=b'', stop=None):
+        abc.MappingView.__init__(self, mapping)
+        self._start = start
+        self._stop = stop
+
+    def __len__(self):
+        if not self._start and self._stop is None:
+            return len(self._mapping)
+        return self._mapping.count_range(self._start, self._stop)
+
+    def __iter__(self):
+        return self._iter()
+
+    def __reversed__(self):
+        return self._iter(reverse=True)
+
+    def _includes(self, key):
+        "Return True if key is present and within the bounds."
+        try:
+            path, _ = self._mapping.prepare_key(key)
+        except TypeError:
+            return False
+        return within(path, self._start, self._stop) and key in self._mapping
+
+    def _nodes(self, reverse=False):
+        "Iterate over (path, node) pairs for the keys within the bounds."
+        mapping = self._mapping
+        for path, node in mapping._iter(mapping._root, self._start,
+                                        self._stop, reverse):
+            if node.meta is not None:
+                yield path, node
+
+
+class KeysView(TrieView, abc.KeysView):
+    "View of the keys of a PrefixDict within bounds."
+
+    __slots__ = ()
+
+    def __contains__(self, key):
+        return self._includes(key)
+
+    def _iter(self, reverse=False):
+        restore_key = self._mapping.restore_key
+        for path, node in self._nodes(reverse):
+            yield restore_key(bytes(path), node.meta)
+
+
+class ItemsView(TrieView, abc.ItemsView):
+    "View of the (key, value) pairs of a PrefixDict within bounds."
+
+    __slots__ = ()
+
+    def __contains__(self, item):
+        key, value = item
+        if not self._includes(key):
+            return False
+        found = self._mapping[key]
+        return found is value or found == value
+
+    def _iter(self, reverse=False):
+        restore_key = self._mapping.restore_key
+        for path, node in self._nodes(reverse):
+            yield restore_key(bytes(path), node.meta), node.value
+
+
+class ValuesView(TrieView, abc.ValuesView):
+    "View of the values of a PrefixDict within bounds."
+
+    __slots__ = ()
+
+    def __contains__(self, value):
+        for found in self:
+            if found is value or found == value:
+                return True
+        return False
+
+    def _iter(self, reverse=False):
+        for _, node in self._nodes(reverse):
+            yield node.value
@@ -6,7 +6,7 @@ except ImportError: # python 2
     from distribute_setup import use_setuptools
     use_setuptools()
 
-import re, sys
+import re
 
 def load_version(filename='prefixtree/version.py'):
     "Parse a __version__ number from a source file"
@@ -43,17 +43,12 @@ setup(
         'License :: OSI Approved :: Apache Software License',
         'Operating System :: OS Independent',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.2',
         'Programming Language :: Python :: 3.3',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: Implementation :: CPython',
         'Programming Language :: Python :: Implementation :: PyPy',
         'Topic :: Software Development :: Libraries :: Python Modules'
     ],
-    tests_require = [] if sys.version_info[0] > 2 else ['unittest2'],
-    test_suite = "tests" if sys.version_info[0] > 2 else 'unittest2.collector'
+    test_suite = "tests"
 )
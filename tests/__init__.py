@@ -0,0 +1,13 @@
+"Helpers shared by the tests"
+
+
+def random_word(rand, length, alphabet='abc'):
+    "Return a word of up to length characters chosen from alphabet by rand."
+    return ''.join(rand.choice(alphabet)
+                   for _ in range(rand.randint(0, length)))
+
+
+def random_words(rand, count, length, alphabet='abc'):
+    "Return the distinct words among count random words, sorted."
+    return sorted(set(random_word(rand, length, alphabet)
+                      for _ in range(count)))
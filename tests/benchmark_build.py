@@ -0,0 +1,47 @@
+"""Test build time with PrefixDict and ArenaPrefixDict.
+
+Use all 3 character permutations of ASCII letters, and the same keys behind a
+shared prefix, as keys and measure the time to insert every key and the time
+taken by a full garbage collection once the trie is built. PrefixDict is built
+both one key at a time and with fromsorted.
+"""
+import gc
+import itertools
+import string
+import sys
+import time
+
+from prefixtree import PrefixDict, ArenaPrefixDict
+
+
+def insert(cls, keys):
+    glossary = cls()
+    for key in keys:
+        glossary[key] = None
+    return glossary
+
+
+if __name__ == '__main__':
+    letters = []
+    for i in range(len(string.ascii_letters)):
+        letters.append(string.ascii_letters[i:i+1].encode('ascii'))
+    keys = [b''.join(word) for word in itertools.permutations(letters, 3)]
+    keys += [b'https://example.com/' + key for key in keys]
+    keys.sort()
+    builders = (
+        ('PrefixDict', lambda: insert(PrefixDict, keys)),
+        ('PrefixDict.fromsorted',
+         lambda: PrefixDict.fromsorted((key, None) for key in keys)),
+        ('ArenaPrefixDict', lambda: insert(ArenaPrefixDict, keys)),
+    )
+    for name, build in builders:
+        gc.collect()
+        start = time.time()
+        glossary = build()
+        build = time.time() - start
+        start = time.time()
+        gc.collect()
+        collect = time.time() - start
+        sys.stdout.write('{0} build {1:.3f} s gc {2:.3f} s\n'.format(
+            name, build, collect))
+        del glossary
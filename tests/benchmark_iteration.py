@@ -0,0 +1,38 @@
+"""Test iteration and membership time with PrefixDict and PrefixSet.
+
+Use all 3 character permutations of ASCII letters as keys and measure the
+time for a full iteration over keys, values and items, and the time per
+membership test for keys that are present and for their 2 character prefixes,
+which are nodes in the trie but not keys.
+"""
+import itertools
+import string
+import sys
+import timeit
+
+from prefixtree import PrefixDict, PrefixSet
+
+
+def best(function, repeat=7):
+    return min(timeit.Timer(function).repeat(repeat, 1))
+
+
+if __name__ == '__main__':
+    letters = []
+    for i in range(len(string.ascii_letters)):
+        letters.append(string.ascii_letters[i:i+1].encode('ascii'))
+    keys = [b''.join(word) for word in itertools.permutations(letters, 3)]
+    prefixes = sorted(set(key[:2] for key in keys))
+    glossary = PrefixDict([(key, None) for key in keys])
+    members = PrefixSet(keys)
+    for name, function in (
+            ('PrefixDict keys', lambda: list(glossary)),
+            ('PrefixDict values', lambda: list(glossary.values())),
+            ('PrefixDict items', lambda: list(glossary.items())),
+            ('PrefixSet keys', lambda: list(members))):
+        sys.stdout.write('{0} {1:.3f} s\n'.format(name, best(function)))
+    for name, probes in (('present', keys), ('prefix', prefixes)):
+        usec = best(lambda: [key in members for key in probes])
+        usec = usec / len(probes) * 1e6
+        sys.stdout.write('PrefixSet.__contains__ {0} {1:.3f} us\n'.format(
+            name, usec))
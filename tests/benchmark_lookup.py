@@ -0,0 +1,59 @@
+"""Test lookup time with PrefixDict and PrefixSet.
+
+Use all 3 character permutations of ASCII letters, and the same keys behind a
+long shared prefix, as keys for PrefixDict and PrefixSet and measure the time
+per lookup for PrefixDict.__getitem__ and PrefixSet.__contains__, for the
+same methods of their frozen copies, and for PrefixDict.__getitem__ with the
+finger enabled. Also measure the time per key for PrefixDict.get_many with
+batches of 500 keys in random order.
+"""
+import itertools
+import random
+import string
+import sys
+import timeit
+
+from prefixtree import PrefixDict, PrefixSet
+
+
+class FingerDict(PrefixDict):
+
+    finger = True
+
+
+def per_lookup(function, keys, repeat=3):
+    timer = timeit.Timer(lambda: [function(key) for key in keys])
+    return min(timer.repeat(repeat, 1)) / len(keys)
+
+
+if __name__ == '__main__':
+    letters = []
+    for i in range(len(string.ascii_letters)):
+        letters.append(string.ascii_letters[i:i+1].encode('ascii'))
+    short = [b''.join(word) for word in itertools.permutations(letters, 3)]
+    base = b'https://example.com/' * 5
+    long = [base + key for key in short]
+    for name, keys in (('short', short), ('long', long)):
+        glossary = PrefixDict([(key, None) for key in keys])
+        members = PrefixSet(keys)
+        usec = per_lookup(glossary.__getitem__, keys) * 1e6
+        sys.stdout.write('PrefixDict.__getitem__ {0} {1:.3f} us\n'.format(
+            name, usec))
+        usec = per_lookup(members.__contains__, keys) * 1e6
+        sys.stdout.write('PrefixSet.__contains__ {0} {1:.3f} us\n'.format(
+            name, usec))
+        usec = per_lookup(FingerDict(glossary).__getitem__, keys) * 1e6
+        sys.stdout.write('PrefixDict.__getitem__ finger {0} {1:.3f} us\n'.format(
+            name, usec))
+        shuffled = list(keys)
+        random.Random(0).shuffle(shuffled)
+        batches = [shuffled[i:i + 500] for i in range(0, len(keys), 500)]
+        usec = per_lookup(glossary.get_many, batches) * 1e6 / 500
+        sys.stdout.write('PrefixDict.get_many {0} {1:.3f} us\n'.format(
+            name, usec))
+        usec = per_lookup(glossary.freeze().__getitem__, keys) * 1e6
+        sys.stdout.write('FrozenPrefixDict.__getitem__ {0} {1:.3f} us\n'.format(
+            name, usec))
+        usec = per_lookup(members.freeze().__contains__, keys) * 1e6
+        sys.stdout.write('FrozenPrefixSet.__contains__ {0} {1:.3f} us\n'.format(
+            name, usec))
@@ -0,0 +1,42 @@
+"""Test set operations between PrefixSets against the generic Set methods.
+
+Use sets of URL like keys that half overlap, are equal or are disjoint, and
+time each operator both with two PrefixSets, which walk both tries together,
+and with a PrefixSet and a frozenset of the same keys, which fall back to the
+generic Set methods. The number of keys defaults to one million.
+"""
+import gc
+import operator
+import sys
+import time
+
+from prefixtree import PrefixSet
+
+
+def timed(operation, first, second):
+    gc.collect()
+    start = time.time()
+    operation(first, second)
+    return time.time() - start
+
+
+if __name__ == '__main__':
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    keys = ['https://example.com/{0:08d}'.format(i)
+            for i in range(size * 2)]
+    first, second = keys[:size], keys[size // 2:size + size // 2]
+    disjoint = keys[size:]
+    left = PrefixSet.fromsorted(first)
+    operands = (
+        ('&', operator.and_, second),
+        ('|', operator.or_, second),
+        ('-', operator.sub, second),
+        ('^', operator.xor, second),
+        ('==', operator.eq, first),
+        ('isdisjoint', lambda a, b: a.isdisjoint(b), disjoint),
+    )
+    for name, operation, other in operands:
+        native = timed(operation, left, PrefixSet.fromsorted(other))
+        fallback = timed(operation, left, frozenset(other))
+        sys.stdout.write('{0} native {1:.3f} s generic {2:.3f} s\n'.format(
+            name, native, fallback))
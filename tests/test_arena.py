@@ -0,0 +1,129 @@
+import itertools
+import random
+import unittest
+
+from prefixtree import PrefixDict, ArenaPrefixDict, ArenaPrefixSet
+from tests import random_word, random_words
+
+
+class TestArenaPrefixDict(unittest.TestCase):
+
+    def test_set_get_del(self):
+        ad = ArenaPrefixDict(a=0, ab=1)
+        self.assertEqual(ad['a'], 0)
+        self.assertEqual(ad['ab'], 1)
+        self.assertRaises(KeyError, ad.__getitem__, 'abc')
+        self.assertNotIn('', ad)
+        del ad['a']
+        self.assertNotIn('a', ad)
+        self.assertRaises(KeyError, ad.__delitem__, 'a')
+        self.assertEqual(len(ad), 1)
+
+    def test_key_types(self):
+        ad = ArenaPrefixDict([('\xe9', 0), (b'\xc3\xa9a', 1)])
+        self.assertEqual(ad[b'\xc3\xa9'], 0)
+        self.assertSequenceEqual(['\xe9', b'\xc3\xa9a'], list(ad))
+        self.assertRaises(TypeError, ad.__setitem__, 1, None)
+
+    def test_reuse(self):
+        ad = ArenaPrefixDict()
+        for _ in range(10):
+            for key in ('abc', 'abd', 'b'):
+                ad[key] = key
+            for key in ('abc', 'abd', 'b'):
+                del ad[key]
+        self.assertEqual(len(ad._parents), 6)
+        self.assertEqual(len(ad._data), 3)
+        self.assertEqual(ad._links, 0)
+
+    def test_slice(self):
+        keys = [''.join(combo) for combo in itertools.product('abc', repeat=3)]
+        ad = ArenaPrefixDict([(key, key) for key in keys])
+        self.assertSequenceEqual(keys[3:6], list(ad['ab':'ab']))
+        self.assertSequenceEqual(keys[5:2:-1], list(ad['ab':'ab':-1]))
+        ad['ab':'ab'] = range(3)
+        self.assertSequenceEqual(list(range(3)), list(ad['ab':'ab']))
+        with self.assertRaises(ValueError):
+            ad['ab':'ab'] = range(2)
+        del ad['ab':'ab']
+        self.assertSequenceEqual(keys[:3] + keys[6:], list(ad))
+
+    def test_slice_del_random(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 200, 5)
+        for _ in range(50):
+            pd = PrefixDict([(key, key) for key in keys])
+            ad = ArenaPrefixDict([(key, key) for key in keys])
+            start, stop = random_word(rand, 3), random_word(rand, 3)
+            del pd[start:stop]
+            del ad[start:stop]
+            self.assertSequenceEqual(list(pd.items()), list(ad.items()))
+            self.assertEqual(len(pd), len(ad))
+            for key in keys:
+                ad[key] = key
+            self.assertSequenceEqual(keys, list(ad))
+        self.assertEqual(len(ad._data), len(keys))
+
+    def test_table(self):
+        rand = random.Random(0)
+        ad = ArenaPrefixDict()
+        alphabet = bytes(range(256)).decode('latin-1')
+        keys = [random_word(rand, 4, alphabet).encode('latin-1')
+                for _ in range(3000)]
+        for key in keys:
+            ad[key] = key
+        for key in keys[::2]:
+            ad.pop(key, None)
+        present = set(keys) - set(keys[::2])
+        self.assertSequenceEqual(sorted(present), list(ad))
+        for key in present:
+            self.assertEqual(key, ad[key])
+        live = len(ad._parents) - len(ad._free_nodes) - 1
+        self.assertEqual(live, ad._links)
+        self.assertLessEqual(ad._links * 3, len(ad._table) * 2)
+
+    def test_commonprefix(self):
+        ad = ArenaPrefixDict(abcd=None)
+        self.assertEqual(b'', ad.commonprefix('efgh'))
+        self.assertEqual(b'ab', ad.commonprefix('abef'))
+        self.assertEqual('abcd', ad.commonprefix('abcdef'))
+
+    def test_random(self):
+        rand = random.Random(0)
+        pd, ad = PrefixDict(), ArenaPrefixDict()
+        for _ in range(2000):
+            key = random_word(rand, 6)
+            if key in pd and rand.random() < 0.5:
+                del pd[key]
+                del ad[key]
+            else:
+                pd[key] = ad[key] = key
+        self.assertSequenceEqual(list(pd), list(ad))
+        self.assertSequenceEqual(list(reversed(pd)), list(reversed(ad)))
+        for _ in range(200):
+            start, stop = random_word(rand, 6), random_word(rand, 6)
+            self.assertSequenceEqual(list(pd[start:stop]), list(ad[start:stop]))
+            self.assertSequenceEqual(list(pd[start:stop:-1]),
+                                     list(ad[start:stop:-1]))
+            self.assertSequenceEqual(list(pd.startswith(start)),
+                                     list(ad.startswith(start)))
+            self.assertEqual(pd.commonprefix(start), ad.commonprefix(start))
+
+
+class TestArenaPrefixSet(unittest.TestCase):
+
+    def test_add_discard(self):
+        keys = [''.join(c) for c in itertools.product('ab', repeat=4)]
+        ps = ArenaPrefixSet(keys)
+        self.assertSequenceEqual(keys, list(ps))
+        self.assertNotIn('ab', ps)
+        for key in keys:
+            ps.discard(key)
+        ps.discard('a')
+        self.assertEqual(len(ps), 0)
+        self.assertEqual(ps._links, 0)
+
+    def test_set_operations(self):
+        ps = ArenaPrefixSet(['a', 'b']) | ArenaPrefixSet(['c'])
+        self.assertSequenceEqual(['a', 'b', 'c'], list(ps))
+        self.assertEqual(ps, set(['a', 'b', 'c']))
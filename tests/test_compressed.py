@@ -0,0 +1,262 @@
+import itertools
+import random
+import unittest
+
+from prefixtree import PrefixDict, PrefixSet
+from tests import random_word, random_words
+
+
+class CompressedDict(PrefixDict):
+
+    compressed = True
+
+
+class CompressedSet(PrefixSet):
+
+    compressed = True
+
+
+def count_nodes(node):
+    return 1 + sum(count_nodes(child) for _, child in node)
+
+
+class TestCompressedDict(unittest.TestCase):
+
+    def test_single_key(self):
+        cd = CompressedDict()
+        cd['https://example.com/'] = 0
+        self.assertEqual(count_nodes(cd._root), 2)
+        self.assertEqual(cd['https://example.com/'], 0)
+        self.assertNotIn('https://example.com', cd)
+        self.assertNotIn('https://example.com/a', cd)
+
+    def test_split(self):
+        cd = CompressedDict()
+        cd['abcd'] = 0
+        cd['abef'] = 1
+        cd['ab'] = 2
+        self.assertEqual(count_nodes(cd._root), 4)
+        self.assertEqual(cd['abcd'], 0)
+        self.assertEqual(cd['abef'], 1)
+        self.assertEqual(cd['ab'], 2)
+        self.assertNotIn('a', cd)
+        self.assertNotIn('abc', cd)
+
+    def test_merge(self):
+        cd = CompressedDict()
+        cd['abcd'] = 0
+        cd['abef'] = 1
+        cd['ab'] = 2
+        del cd['ab']
+        del cd['abef']
+        self.assertEqual(count_nodes(cd._root), 2)
+        self.assertEqual(cd['abcd'], 0)
+        del cd['abcd']
+        self.assertEqual(len(cd._root), 0)
+
+    def test_compact_merges(self):
+        keys = ['https://example.com/a', 'https://example.com/b']
+        cd = CompressedDict()
+        cd._root = PrefixDict([(key, key) for key in keys])._root
+        cd._values = len(keys)
+        self.assertGreater(cd.compact(), 0)
+        self.assertEqual(count_nodes(cd._root), 4)
+        self.assertSequenceEqual(keys, list(cd))
+        self.assertEqual(cd.commonprefix('https://example.org'), b'https://example.')
+
+    def test_delete_missing(self):
+        cd = CompressedDict(abcd=0)
+        self.assertRaises(KeyError, cd.__delitem__, 'ab')
+        self.assertRaises(KeyError, cd.__delitem__, 'abce')
+        self.assertEqual(cd['abcd'], 0)
+
+    def test_shared_prefix_nodes(self):
+        cd = CompressedDict()
+        for page in 'abcdefghij':
+            cd['https://example.com/{0}/index.html'.format(page)] = page
+        plain = PrefixDict(cd)
+        self.assertLess(count_nodes(cd._root) * 10, count_nodes(plain._root))
+
+    def test_commonprefix_edge(self):
+        cd = CompressedDict(abcd=None)
+        self.assertEqual(b'', cd.commonprefix('efgh'))
+        self.assertEqual(b'ab', cd.commonprefix('abef'))
+        self.assertEqual(b'ab', cd.commonprefix('ab'))
+        self.assertEqual('abcd', cd.commonprefix('abcdef'))
+
+    def test_startswith_edge(self):
+        cd = CompressedDict()
+        keys = ['abcd', 'abce', 'abd', 'b']
+        for key in keys:
+            cd[key] = None
+        self.assertSequenceEqual(['abcd', 'abce'], list(cd.startswith('abc')))
+        self.assertSequenceEqual(['abcd'], list(cd.startswith('abcd')))
+        self.assertSequenceEqual([], list(cd.startswith('abcf')))
+
+    def test_slice(self):
+        cd = CompressedDict()
+        keys = ['aaaa', 'aabb', 'abab', 'bbbb', 'bbcc']
+        for key in keys:
+            cd[key] = key
+        self.assertSequenceEqual(keys[1:4], list(cd['aab':'bbb']))
+        self.assertSequenceEqual(keys[3:0:-1], list(cd['aab':'bbb':-1]))
+
+    def test_slice_bounds(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 200, 8)
+        cd = CompressedDict([(key, key) for key in keys])
+        for _ in range(200):
+            start, stop = random_word(rand, 6), random_word(rand, 6)
+            subset = [k for k in keys if start <= k and k[:len(stop)] <= stop]
+            self.assertSequenceEqual(subset, list(cd[start:stop]))
+            self.assertSequenceEqual(subset[::-1], list(cd[start:stop:-1]))
+
+    def test_fromsorted(self):
+        rand = random.Random(0)
+        keys = sorted(random_word(rand, 8) for _ in range(300))
+        cd = CompressedDict.fromsorted((key, key) for key in keys)
+        self.assertIsInstance(cd, CompressedDict)
+        self.assertEqual(count_nodes(cd._root),
+                         count_nodes(CompressedDict(list(zip(keys, keys)))._root))
+        self.assertSequenceEqual(sorted(set(keys)), list(cd))
+        for key in keys:
+            self.assertEqual(cd[key], key)
+
+    def test_get_many(self):
+        cd = CompressedDict(abcd=0, abce=1, abx=2)
+        keys = ['abce', 'ab', 'abcd', 'abc', 'abcdz', 'abx', 'a']
+        self.assertSequenceEqual([1, None, 0, None, None, 2, None],
+                                 cd.get_many(keys))
+
+    def test_longest_prefix(self):
+        cd = CompressedDict([('/a/b/', 2), ('/a/b/cdef', 3)])
+        self.assertEqual(('/a/b/', 2), cd.longest_prefix('/a/b/cde'))
+        self.assertEqual(('/a/b/cdef', 3), cd.longest_prefix('/a/b/cdefg'))
+        self.assertRaises(KeyError, cd.longest_prefix, '/a/')
+        self.assertSequenceEqual(['/a/b/', '/a/b/cdef'],
+                                 list(cd.iter_prefixes('/a/b/cdef')))
+
+    def test_fuzzy(self):
+        cd = CompressedDict([('abcdef', 0), ('abcxyz', 1), ('abd', 2)])
+        self.assertSequenceEqual([('abcdef', 1), ('abd', 2)],
+                                 list(cd.fuzzy('abcdf', 2)))
+        self.assertSequenceEqual([('abcxyz', 1, 1)],
+                                 list(cd.fuzzy('abxyz', 2, values=True)))
+
+    def test_match(self):
+        cd = CompressedDict([('abcdef', 0), ('abcxyz', 1), ('abd', 2)])
+        self.assertSequenceEqual(['abcdef'], list(cd.match('abc*f')))
+        self.assertSequenceEqual(['abcxyz', 'abd'], list(cd.match('ab?x*')) +
+                                 list(cd.match('ab[!c]*')))
+        self.assertSequenceEqual([], list(cd.match('abcd')))
+
+    def test_slice_del(self):
+        cd = CompressedDict([(key, key) for key in
+                             ('abcdef', 'abcxyz', 'abd', 'abdz', 'b')])
+        del cd['abcx':'abd']
+        self.assertSequenceEqual(['abcdef', 'b'], list(cd))
+        self.assertEqual(count_nodes(cd._root),
+                         count_nodes(CompressedDict([(key, key)
+                                                     for key in cd])._root))
+
+    def test_cursor(self):
+        cd = CompressedDict([(key, key) for key in
+                             ('abcdef', 'abcxyz', 'abd', 'abdz', 'b')])
+        cursor = cd.cursor()
+        self.assertTrue(cursor.seek('abc'))
+        self.assertEqual('abcdef', cursor.key)
+        self.assertTrue(cursor.seek('abcdz'))
+        self.assertEqual('abcxyz', cursor.key)
+        self.assertTrue(cursor.seek('abcz'))
+        self.assertEqual('abd', cursor.key)
+        self.assertTrue(cursor.seek('abd', inclusive=False))
+        self.assertEqual('abdz', cursor.key)
+        self.assertTrue(cursor.prev())
+        self.assertTrue(cursor.prev())
+        self.assertEqual('abcxyz', cursor.value)
+        self.assertFalse(cursor.seek('bb'))
+        self.assertTrue(cursor.prev())
+        self.assertEqual('b', cursor.key)
+
+    def test_nearest(self):
+        cd = CompressedDict([(key, key) for key in
+                             ('abcdef', 'abcxyz', 'abd', 'abdz', 'b')])
+        self.assertEqual('abcdef', cd.ceiling('abc'))
+        self.assertEqual('abcxyz', cd.floor('abcz'))
+        self.assertEqual('abcdef', cd.floor('abcw'))
+        self.assertEqual('abcxyz', cd.floor('abcxz'))
+        self.assertEqual('abd', cd.higher('abcxyz'))
+        self.assertEqual('abdz', cd.lower('b'))
+        self.assertRaises(KeyError, cd.lower, 'abcdef')
+        self.assertEqual(('abcdef', 'b'), (cd.min(), cd.max()))
+
+    def test_list_dir(self):
+        cd = CompressedDict([(key, key) for key in
+                             ('bucket/a/x.txt', 'bucket/a/y/z.txt',
+                              'bucket/b')])
+        self.assertEqual((['bucket/b'], ['bucket/a/']),
+                         cd.list_dir('bucket/'))
+        self.assertEqual(([], ['bucket/']), cd.list_dir('b'))
+        self.assertEqual((['bucket/a/x.txt'], ['bucket/a/y/']),
+                         cd.list_dir('bucket/a/'))
+
+    def test_random(self):
+        rand = random.Random(0)
+        keys = set()
+        cd = CompressedDict()
+        for _ in range(2000):
+            key = random_word(rand, 6)
+            if key in keys and rand.random() < 0.5:
+                keys.remove(key)
+                del cd[key]
+            else:
+                keys.add(key)
+                cd[key] = key
+        self.assertSequenceEqual(sorted(keys), list(cd))
+        self.assertSequenceEqual(sorted(keys, reverse=True), list(reversed(cd)))
+        for key in keys:
+            self.assertEqual(cd[key], key)
+
+
+class TestCompressedSet(unittest.TestCase):
+
+    def test_add_discard(self):
+        keys = [''.join(c) for c in itertools.product('ab', repeat=4)]
+        cs = CompressedSet()
+        for key in keys:
+            cs.add(key)
+        self.assertSequenceEqual(keys, list(cs))
+        for key in keys:
+            cs.discard(key)
+        self.assertEqual(len(cs), 0)
+        self.assertEqual(len(cs._root), 0)
+
+    def test_set_operations(self):
+        first = CompressedSet(['abcdef', 'abcxyz', 'abd', 'b'])
+        second = CompressedSet(['abcdef', 'abcx', 'ab', 'c'])
+        self.assertSequenceEqual(['abcdef'], list(first & second))
+        self.assertSequenceEqual(['ab', 'abcdef', 'abcx', 'abcxyz', 'abd',
+                                  'b', 'c'], list(first | second))
+        self.assertSequenceEqual(['abcxyz', 'abd', 'b'], list(first - second))
+        self.assertSequenceEqual(list(first),
+                                 list(first - CompressedSet(['abc'])))
+        self.assertFalse(first.isdisjoint(second))
+        self.assertTrue(first.isdisjoint(CompressedSet(['abcx'])))
+        merged = first | second
+        self.assertEqual(count_nodes(merged._root),
+                         count_nodes(CompressedSet(list(merged))._root))
+        self.assertSequenceEqual(list(first ^ second),
+                                 sorted(set(first) ^ set(second)))
+        mixed = first & PrefixSet(['abcdef'])
+        self.assertSequenceEqual(['abcdef'], list(mixed))
+
+    def test_pop_prefix(self):
+        cs = CompressedSet(['abcdef', 'abcxyz', 'abd', 'b'])
+        popped = cs.pop_prefix('abcx')
+        self.assertSequenceEqual(['abcxyz'], list(popped))
+        self.assertEqual(2, count_nodes(popped._root))
+        self.assertSequenceEqual(['abcdef', 'abd', 'b'], list(cs))
+        self.assertEqual(count_nodes(cs._root),
+                         count_nodes(CompressedSet(list(cs))._root))
+        self.assertEqual(2, cs.delete_prefix('ab'))
+        self.assertEqual(2, count_nodes(cs._root))
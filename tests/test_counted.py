@@ -0,0 +1,110 @@
+import bisect
+import random
+import unittest
+
+from prefixtree import PrefixDict, PrefixSet, trie
+from tests import random_word
+
+
+class CountedDict(PrefixDict):
+
+    counted = True
+
+
+class CompressedCountedDict(PrefixDict):
+
+    compressed = True
+
+    counted = True
+
+
+class CountedSet(PrefixSet):
+
+    counted = True
+
+
+class TestCountedDict(unittest.TestCase):
+
+    def test_counts(self):
+        cd = CountedDict(a=0, ab=1, abc=2, b=3)
+        self.assertEqual(4, cd._root._count)
+        self.assertEqual(3, cd.count_prefix('a'))
+        self.assertEqual(0, cd.count_prefix('c'))
+        self.assertEqual(2, cd.count_range('ab', 'ab'))
+        self.assertEqual(4, cd.count_range())
+        self.assertEqual(0, cd.count_range('b', 'a'))
+        self.assertEqual(1, cd.rank('ab'))
+        self.assertEqual(3, cd.rank('abd'))
+        self.assertEqual(4, cd.rank('c'))
+        self.assertEqual('abc', cd.select(2))
+        self.assertEqual('b', cd.select(-1))
+        self.assertRaises(IndexError, cd.select, 4)
+        del cd['ab']
+        self.assertEqual(2, cd.count_prefix('a'))
+        self.assertEqual('abc', cd.select(1))
+
+    def test_wide(self):
+        keys = [chr(o) + 'a' for o in range(1, 128)]
+        cd = CountedDict()
+        for key in keys:
+            cd[key] = key
+        self.assertIsInstance(cd._root, trie.StatsDenseNode)
+        self.assertEqual(127, cd._root._count)
+        for key in keys[:100]:
+            del cd[key]
+        self.assertIsInstance(cd._root, trie.StatsIndexedNode)
+        self.assertEqual(keys[100], cd.select(0))
+        self.assertFalse(hasattr(PrefixDict(a=0)._root, '_count'))
+
+    def test_fromsorted(self):
+        cd = CountedDict.fromsorted([('a', 0), ('ab', 1), ('b', 2)])
+        self.assertEqual(2, cd.count_prefix('a'))
+        self.assertEqual('b', cd.select(2))
+
+    def test_uncounted(self):
+        pd = PrefixDict(a=0, ab=1, abc=2, b=3)
+        self.assertEqual(3, pd.count_prefix('a'))
+        self.assertEqual(2, pd.count_range('ab', 'ab'))
+        self.assertEqual(3, pd.rank('abd'))
+        self.assertEqual('abc', pd.select(2))
+
+    def test_random(self):
+        rand = random.Random(0)
+        for cls in (CountedDict, CompressedCountedDict):
+            cd = cls()
+            for _ in range(1000):
+                key = random_word(rand, 6)
+                if key in cd and rand.random() < 0.4:
+                    del cd[key]
+                else:
+                    cd[key] = key
+            del cd['b':'bb']
+            cd.delete_prefix('ac')
+            popped = cd.pop_prefix('ca')
+            self.assertEqual(len(popped), popped.count_prefix(''))
+            cd.compact()
+            keys = list(cd)
+            for _ in range(200):
+                start, stop = random_word(rand, 4), random_word(rand, 4)
+                self.assertEqual(len(list(cd.startswith(start))),
+                                 cd.count_prefix(start))
+                self.assertEqual(len(list(cd[start:stop])),
+                                 cd.count_range(start, stop))
+                self.assertEqual(bisect.bisect_left(keys, start),
+                                 cd.rank(start))
+            for index, key in enumerate(keys):
+                self.assertEqual(key, cd.select(index))
+            self.assertEqual(len(list(cd.items(prefix='a'))),
+                             len(cd.items(prefix='a')))
+
+
+class TestCountedSet(unittest.TestCase):
+
+    def test_add_discard(self):
+        cs = CountedSet(['a', 'ab', 'b'])
+        cs.add('ab')
+        cs.discard('c')
+        self.assertEqual(3, cs._root._count)
+        cs.discard('a')
+        self.assertEqual(1, cs.count_prefix('a'))
+        self.assertEqual(['ab', 'b'], [cs.select(i) for i in range(2)])
@@ -0,0 +1,77 @@
+import random
+import unittest
+
+from prefixtree import PrefixDict, PrefixSet
+from tests import random_word
+
+
+class FingerDict(PrefixDict):
+
+    finger = True
+
+
+class CompressedFingerDict(PrefixDict):
+
+    compressed = True
+
+    finger = True
+
+
+class FingerSet(PrefixSet):
+
+    finger = True
+
+
+class TestFingerDict(unittest.TestCase):
+
+    def test_resume(self):
+        fd = FingerDict(abcd=0, abce=1)
+        fd['abcd']
+        self.assertEqual([offset for offset, _ in fd._finger], [0, 1, 2, 3, 4])
+        self.assertEqual(fd['abce'], 1)
+        self.assertEqual([offset for offset, _ in fd._finger], [0, 1, 2, 3, 4])
+        self.assertIs(fd._finger[-1][1], fd._search(b'abce', fd._root))
+        self.assertRaises(KeyError, fd.__getitem__, 'abx')
+        self.assertEqual([offset for offset, _ in fd._finger], [0, 1, 2])
+
+    def test_delete_drops_finger(self):
+        fd = FingerDict(abcd=0, abce=1)
+        fd['abcd']
+        del fd['abcd']
+        self.assertEqual(len(fd._finger), 1)
+        self.assertNotIn('abcd', fd)
+        fd['abcd'] = 2
+        self.assertEqual(fd['abcd'], 2)
+
+    def test_random(self):
+        rand = random.Random(0)
+        for cls in (FingerDict, CompressedFingerDict):
+            keys = {}
+            fd = cls()
+            for _ in range(3000):
+                key = random_word(rand, 6)
+                choice = rand.random()
+                if key in keys and choice < 0.2:
+                    del keys[key]
+                    del fd[key]
+                elif choice < 0.6:
+                    keys[key] = key
+                    fd[key] = key
+                else:
+                    self.assertEqual(key in keys, key in fd)
+                    self.assertEqual(keys.get(key), fd.get(key))
+            self.assertSequenceEqual(sorted(keys), list(fd))
+            self.assertEqual(len(keys), len(fd))
+
+
+class TestFingerSet(unittest.TestCase):
+
+    def test_add_discard(self):
+        keys = ['https://example.com/{0}'.format(i) for i in range(100)]
+        fs = FingerSet(keys)
+        for key in keys:
+            self.assertIn(key, fs)
+        self.assertNotIn('https://example.com/', fs)
+        for key in keys[::2]:
+            fs.discard(key)
+        self.assertSequenceEqual(sorted(keys[1::2]), list(fs))
@@ -0,0 +1,197 @@
+import itertools
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import unittest
+
+from prefixtree import PrefixDict, PrefixSet, FrozenPrefixDict, FrozenPrefixSet
+from tests import random_word, random_words
+
+
+class CompressedDict(PrefixDict):
+
+    compressed = True
+
+
+class TestFrozenPrefixDict(unittest.TestCase):
+
+    def test_freeze(self):
+        pd = PrefixDict(a=0, ab=1, b=2)
+        fd = pd.freeze()
+        self.assertIsInstance(fd, FrozenPrefixDict)
+        self.assertEqual(dict(fd), dict(pd))
+        pd['c'] = 3
+        self.assertNotIn('c', fd)
+
+    def test_construct(self):
+        fd = FrozenPrefixDict([('a', 0), ('b', 1)], c=2)
+        self.assertSequenceEqual(['a', 'b', 'c'], list(fd))
+        self.assertEqual(FrozenPrefixDict({'a': 0})['a'], 0)
+        self.assertEqual(len(FrozenPrefixDict()), 0)
+
+    def test_immutable(self):
+        fd = PrefixDict(a=0).freeze()
+        with self.assertRaises(TypeError):
+            fd['b'] = 1
+        with self.assertRaises(TypeError):
+            del fd['a']
+
+    def test_missing(self):
+        fd = PrefixDict(abc=0, abd=1).freeze()
+        for key in ('', 'a', 'ab', 'abe', 'abcd', 'b', b'\xff'):
+            self.assertNotIn(key, fd)
+            self.assertRaises(KeyError, fd.__getitem__, key)
+        self.assertRaises(TypeError, fd.__getitem__, 1)
+
+    def test_key_types(self):
+        fd = PrefixDict([('\xe9', 0), (b'\xc3\xa9a', 1)]).freeze()
+        self.assertEqual(fd['\xe9'], 0)
+        self.assertEqual(fd[b'\xc3\xa9'], 0)
+        self.assertSequenceEqual(['\xe9', b'\xc3\xa9a'], list(fd))
+
+    def test_every_byte(self):
+        keys = [bytes(bytearray([i, j])) for i in (0, 255) for j in range(256)]
+        fd = PrefixDict([(key, key) for key in keys]).freeze()
+        self.assertSequenceEqual(keys, list(fd))
+        for key in keys:
+            self.assertEqual(fd[key], key)
+
+    def test_commonprefix(self):
+        fd = CompressedDict(abcd=None, abx=None).freeze()
+        self.assertEqual(b'', fd.commonprefix('efgh'))
+        self.assertEqual(b'abc', fd.commonprefix('abce'))
+        self.assertEqual(b'ab', fd.commonprefix('ab'))
+        self.assertEqual('abcd', fd.commonprefix('abcdef'))
+        self.assertEqual(b'abcd', fd.commonprefix('abcdef', False))
+
+    def test_startswith(self):
+        keys = ['abcd', 'abce', 'abd', 'b']
+        fd = PrefixDict([(key, None) for key in keys]).freeze()
+        self.assertSequenceEqual(['abcd', 'abce'], list(fd.startswith('abc')))
+        self.assertSequenceEqual(['abce', 'abcd'],
+                                 list(fd.startswith('abc', reverse=True)))
+        self.assertSequenceEqual([], list(fd.startswith('abcf')))
+        self.assertSequenceEqual(keys, list(fd.startswith('')))
+
+    def test_slice(self):
+        keys = ['aaaa', 'aabb', 'abab', 'bbbb', 'bbcc']
+        fd = PrefixDict([(key, key) for key in keys]).freeze()
+        self.assertSequenceEqual(keys[1:4], list(fd['aab':'bbb']))
+        self.assertSequenceEqual(keys[3:0:-1], list(fd['aab':'bbb':-1]))
+        self.assertSequenceEqual(keys, list(fd[:]))
+        self.assertRaises(ValueError, fd.__getitem__, slice(None, None, 2))
+
+    def test_pickle(self):
+        fd = PrefixDict(a=0, ab=1).freeze()
+        self.assertEqual(dict(pickle.loads(pickle.dumps(fd))), dict(fd))
+
+    def test_random(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 300, 8)
+        for cls in (PrefixDict, CompressedDict):
+            trie = cls([(key, key) for key in keys])
+            fd = trie.freeze()
+            self.assertSequenceEqual(keys, list(fd))
+            self.assertSequenceEqual(keys[::-1], list(reversed(fd)))
+            for key in keys:
+                self.assertEqual(fd[key], key)
+            for _ in range(100):
+                start, stop = random_word(rand, 6), random_word(rand, 6)
+                self.assertEqual(start in trie, start in fd)
+                self.assertEqual(trie.commonprefix(start),
+                                 fd.commonprefix(start))
+                self.assertSequenceEqual(list(trie.startswith(start)),
+                                         list(fd.startswith(start)))
+                self.assertSequenceEqual(list(trie[start:stop]),
+                                         list(fd[start:stop]))
+                self.assertSequenceEqual(list(trie[start:stop:-1]),
+                                         list(fd[start:stop:-1]))
+
+
+class TestFrozenFile(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, 'trie')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_write_open(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 300, 8)
+        for cls in (PrefixDict, CompressedDict):
+            fd = cls([(key, [key]) for key in keys]).freeze()
+            fd.write(self.filename)
+            mapped = FrozenPrefixDict.open(self.filename)
+            self.assertSequenceEqual(keys, list(mapped))
+            self.assertSequenceEqual(keys[::-1], list(reversed(mapped)))
+            for key in keys:
+                self.assertEqual(mapped[key], [key])
+            for _ in range(100):
+                start, stop = random_word(rand, 6), random_word(rand, 6)
+                self.assertEqual(start in fd, start in mapped)
+                self.assertEqual(fd.commonprefix(start),
+                                 mapped.commonprefix(start))
+                self.assertSequenceEqual(list(fd.startswith(start)),
+                                         list(mapped.startswith(start)))
+                self.assertSequenceEqual(list(fd[start:stop:-1]),
+                                         list(mapped[start:stop:-1]))
+
+    def test_rewrite(self):
+        PrefixDict(a=0, ab=1).freeze().write(self.filename)
+        mapped = FrozenPrefixDict.open(self.filename)
+        copy = self.filename + '.copy'
+        mapped.write(copy)
+        self.assertEqual(dict(FrozenPrefixDict.open(copy)), {'a': 0, 'ab': 1})
+
+    def test_empty(self):
+        PrefixDict().freeze().write(self.filename)
+        self.assertEqual(len(FrozenPrefixDict.open(self.filename)), 0)
+
+    def test_set(self):
+        PrefixSet(['a', 'b']).freeze().write(self.filename)
+        self.assertEqual(FrozenPrefixSet.open(self.filename), set(['a', 'b']))
+        self.assertRaises(ValueError, FrozenPrefixDict.open, self.filename)
+        PrefixDict(a=0).freeze().write(self.filename)
+        self.assertEqual(FrozenPrefixSet.open(self.filename), set(['a']))
+
+    def test_invalid(self):
+        with open(self.filename, 'wb') as stream:
+            stream.write(b'not a trie')
+        self.assertRaises(ValueError, FrozenPrefixDict.open, self.filename)
+        PrefixDict(a=0).freeze().write(self.filename)
+        with open(self.filename, 'r+b') as stream:
+            stream.truncate(os.path.getsize(self.filename) - 1)
+        self.assertRaises(ValueError, FrozenPrefixDict.open, self.filename)
+
+
+class TestFrozenPrefixSet(unittest.TestCase):
+
+    def test_freeze(self):
+        keys = [''.join(c) for c in itertools.product('ab', repeat=3)]
+        ps = PrefixSet(keys)
+        fs = ps.freeze()
+        self.assertIsInstance(fs, FrozenPrefixSet)
+        self.assertSequenceEqual(keys, list(fs))
+        self.assertEqual(fs, set(keys))
+        self.assertNotIn('ab', fs)
+        self.assertIsNone(fs._values)
+
+    def test_set_operations(self):
+        fs = FrozenPrefixSet(['a', 'b'])
+        union = fs | FrozenPrefixSet(['c'])
+        self.assertIsInstance(union, FrozenPrefixSet)
+        self.assertSequenceEqual(['a', 'b', 'c'], list(union))
+        self.assertSequenceEqual(['a'], list(fs - set(['b'])))
+
+    def test_hash(self):
+        fs = FrozenPrefixSet(['a', 'b'])
+        same = FrozenPrefixSet(['b', 'a'])
+        self.assertEqual(fs, same)
+        self.assertEqual(hash(fs), hash(same))
+        self.assertEqual(1, len(set([fs, same])))
+        self.assertEqual('ab', {fs: 'ab'}[same])
+        self.assertNotIn(FrozenPrefixSet(['a']), {fs: 'ab'})
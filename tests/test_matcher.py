@@ -0,0 +1,72 @@
+import io
+import random
+import unittest
+
+from prefixtree import PrefixDict, PrefixSet
+from tests import random_word
+
+
+class CompressedDict(PrefixDict):
+
+    compressed = True
+
+
+def brute_force(keys, data):
+    "Return sorted (offset, key) pairs for every occurrence of keys in data."
+    return sorted((offset, key) for key in keys if key
+                  for offset in range(len(data))
+                  if data.startswith(key.encode('utf-8'), offset))
+
+
+class TestMatcher(unittest.TestCase):
+
+    def test_scan(self):
+        matcher = PrefixDict(he=1, she=2, his=3, hers=4).compile_matcher()
+        self.assertSequenceEqual([(1, 'she', 2), (2, 'he', 1), (2, 'hers', 4)],
+                                 list(matcher.scan(b'ushers')))
+        self.assertSequenceEqual([], list(matcher.scan(b'')))
+
+    def test_prefix_set(self):
+        matcher = PrefixSet(['a', 'ab', 'b', '']).compile_matcher()
+        self.assertSequenceEqual([(0, 'a', None), (0, 'ab', None),
+                                  (1, 'b', None)],
+                                 sorted(matcher.scan(b'ab')))
+
+    def test_input_types(self):
+        matcher = PrefixDict(abc=0, bcd=1).compile_matcher()
+        expected = [(1, 'abc', 0), (2, 'bcd', 1), (5, 'abc', 0)]
+        data = b'xabcdabc'
+        self.assertSequenceEqual(expected, list(matcher.scan(bytearray(data))))
+        self.assertSequenceEqual(expected, list(matcher.scan(memoryview(data))))
+        self.assertSequenceEqual(expected, list(matcher.scan(io.BytesIO(data))))
+        chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+        self.assertSequenceEqual(expected, list(matcher.scan(chunks)))
+
+    def test_every_byte(self):
+        keys = [bytes([byte, 255 - byte]) for byte in range(256)] + [b'\x00']
+        matcher = PrefixSet(keys).compile_matcher()
+        data = bytes(range(256)) + bytes(range(255, -1, -1))
+        found = sorted((offset, key) for offset, key, _ in matcher.scan(data))
+        expected = sorted((offset, key) for key in keys
+                          for offset in range(len(data))
+                          if data.startswith(key, offset))
+        self.assertSequenceEqual(expected, found)
+        self.assertEqual(len(keys), len(matcher._keys))
+        self.assertSequenceEqual(sorted(keys), matcher._keys)
+
+    def test_snapshot(self):
+        pd = PrefixDict(a=0)
+        matcher = pd.compile_matcher()
+        pd['b'] = 1
+        self.assertSequenceEqual([(0, 'a', 0)], list(matcher.scan(b'ab')))
+
+    def test_random(self):
+        rand = random.Random(0)
+        for cls in (PrefixDict, CompressedDict):
+            for _ in range(100):
+                keys = set(random_word(rand, 5) for _ in range(20))
+                data = random_word(rand, 60).encode('utf-8')
+                matcher = cls([(key, key) for key in keys]).compile_matcher()
+                found = [(offset, key) for offset, key, value
+                         in matcher.scan(data) if key == value]
+                self.assertSequenceEqual(brute_force(keys, data), sorted(found))
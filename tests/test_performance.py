@@ -1,22 +1,14 @@
-from __future__ import print_function
 import os
 import subprocess
 import sys
+import unittest
 
-try:
-    # python 2.x
-    import unittest2 as unittest
-    PENALTY_MEM = 10
-    PENALTY_CPU = 100
-except ImportError:
-    # python 3.x
-    import unittest
-    PENALTY_MEM = 10
-    PENALTY_CPU = 150
+PENALTY_MEM = 10
+PENALTY_CPU = 150
 
 
 enableIf = unittest.skipIf(
-        os.getenv('PREFIXTREE_PERF') is None or sys.version_info[:2] < (2, 7),
+        os.getenv('PREFIXTREE_PERF') is None,
         'Set PREFIXTREE_PERF environment variable to run performance tests')
 
 
@@ -1,23 +1,23 @@
+import bisect
 import itertools
 import operator
 import pickle
+import random
 import string
+import unittest
+from itertools import filterfalse
 
-try:
-    # python 2.x
-    import unittest2 as unittest
-except ImportError:
-    # python 3.x
-    import unittest
+from prefixtree import PrefixDict
+from tests import random_word, random_words
 
-try:
-    # python 2.x
-    from itertools import ifilterfalse as filterfalse
-except ImportError:
-    # python 3.x
-    from itertools import filterfalse
 
-from prefixtree import PrefixDict
+def levenshtein(first, second):
+    row = list(range(len(second) + 1))
+    for index, char in enumerate(first, 1):
+        previous, row = row, [index]
+        for other, prior, diagonal in zip(second, previous[1:], previous):
+            row.append(min(prior + 1, row[-1] + 1, diagonal + (char != other)))
+    return row[-1]
 
 
 class TestPrefixDict(unittest.TestCase):
@@ -59,6 +59,9 @@ class TestPrefixDict(unittest.TestCase):
     def test_long_key(self):
         self.insert_search_delete([string.printable])
 
+    def test_very_long_key(self):
+        self.insert_search_delete(['ab' * 5000, 'ab' * 4999 + 'b'])
+
     def test_repeated_key(self):
         self.insert_search_delete(['\xFF', '\xFF'])
 
@@ -138,6 +141,13 @@ class TestPrefixDict(unittest.TestCase):
             pd[key] = None
         self.assertSequenceEqual(keys, list(iter(pd)))
 
+    def test_reversed_sort_order(self):
+        pd = PrefixDict()
+        keys = ['', 'a', 'aa', 'ab', 'b', 'ba']
+        for key in keys:
+            pd[key] = None
+        self.assertSequenceEqual(list(reversed(keys)), list(reversed(pd)))
+
     def test_commonprefix_empty(self):
         pd = PrefixDict(abcd=None)
         self.assertEqual(b'', pd.commonprefix('efgh'))
@@ -207,6 +217,26 @@ class TestPrefixDict(unittest.TestCase):
         subset = [k.upper() for k in keys if not k.startswith('a')]
         self.assertSequenceEqual(subset, list(pd['b':]))
 
+    def test_slice_open_end_prefix(self):
+        pd = PrefixDict(a=0, ab=1, b=2, ba=3)
+        self.assertSequenceEqual([1, 2, 3], list(pd['ab':]))
+
+    def test_slice_bounds(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 200, 5)
+        pd = PrefixDict([(key, key) for key in keys])
+        for _ in range(200):
+            start, stop = random_word(rand, 4), random_word(rand, 4)
+            subset = [k for k in keys if start <= k and k[:len(stop)] <= stop]
+            self.assertSequenceEqual(subset, list(pd[start:stop]))
+            self.assertSequenceEqual(subset[::-1], list(pd[start:stop:-1]))
+
+    def test_iter_very_long_key(self):
+        keys = ['ab' * 5000, 'ab' * 4999 + 'b']
+        pd = PrefixDict([(key, None) for key in keys])
+        self.assertSequenceEqual(keys, list(pd))
+        self.assertSequenceEqual(keys[::-1], list(reversed(pd)))
+
     def test_slice_del(self):
         pd = PrefixDict()
         keys = [''.join(combo) for combo in itertools.product('abc', repeat=3)]
@@ -257,3 +287,298 @@ class TestPrefixDict(unittest.TestCase):
         pd = PrefixDict(a=0, b=1, c=2)
         del pd['b']
         list(pd)
+
+    def test_compact(self):
+        keys = [a + chr(b) for a in 'abc' for b in range(64, 128)]
+        pd = PrefixDict([(key, key) for key in keys])
+        for key in keys:
+            if key[1] < 'T':
+                del pd[key]
+        self.assertGreater(pd.compact(), 0)
+        self.assertEqual(pd.compact(), 0)
+        self.assertSequenceEqual([k for k in keys if k[1] >= 'T'], list(pd))
+        pd['a@'] = None
+        self.assertIn('a@', pd)
+
+    def test_get_deleted_prefix(self):
+        pd = PrefixDict(ab=0, abc=1)
+        del pd['ab']
+        self.assertRaises(KeyError, pd.__getitem__, 'ab')
+        self.assertRaises(KeyError, pd.__getitem__, 'a')
+        self.assertRaises(KeyError, pd.__delitem__, 'ab')
+        self.assertNotIn('ab', pd)
+        self.assertSequenceEqual(['abc'], list(pd))
+
+    def test_fromsorted(self):
+        keys = [''.join(combo) for combo in itertools.product('abc', repeat=3)]
+        keys = sorted(keys + ['', 'a', 'ab', 'b'])
+        pd = PrefixDict.fromsorted((key, key.upper()) for key in keys)
+        self.assertIsInstance(pd, PrefixDict)
+        self.assertEqual(len(pd), len(keys))
+        self.assertSequenceEqual(keys, list(pd))
+        self.assertSequenceEqual([key.upper() for key in keys],
+                                 list(pd.values()))
+
+    def test_fromsorted_duplicates(self):
+        pd = PrefixDict.fromsorted([('a', 0), ('a', 1), (b'b', 2)])
+        self.assertEqual(len(pd), 2)
+        self.assertEqual(pd['a'], 1)
+        self.assertSequenceEqual(['a', b'b'], list(pd))
+
+    def test_fromsorted_unsorted(self):
+        with self.assertRaises(ValueError):
+            PrefixDict.fromsorted([('ab', 0), ('a', 1)])
+
+    def test_get_many(self):
+        pd = PrefixDict(abc=0, abd=1, b=2, ab=None)
+        pd['a'] = 3
+        del pd['a']
+        keys = ['b', 'abd', 'a', 'abc', '', 'abcd', b'abd', 'x', 'ab']
+        self.assertSequenceEqual([2, 1, None, 0, None, None, 1, None, None],
+                                 pd.get_many(keys))
+        self.assertSequenceEqual([2, -1, -1], pd.get_many(['b', 'a', 'x'], -1))
+        self.assertSequenceEqual([], pd.get_many([]))
+        self.assertRaises(TypeError, pd.get_many, [1])
+
+    def test_contains_many(self):
+        pd = PrefixDict(abc=0, abd=1, b=2, ab=None)
+        keys = ['b', 'abd', 'a', 'abc', '', 'abcd', 'ab', 'ab']
+        self.assertSequenceEqual([key in pd for key in keys],
+                                 pd.contains_many(keys))
+
+    def test_longest_prefix(self):
+        pd = PrefixDict([('', 0), ('/a', 1), ('/a/b/', 2), (b'/a/b/c', 3)])
+        self.assertEqual(('/a/b/', 2), pd.longest_prefix('/a/b/x'))
+        self.assertEqual((b'/a/b/c', 3), pd.longest_prefix('/a/b/cd'))
+        self.assertEqual(('/a', 1), pd.longest_prefix('/a'))
+        self.assertEqual(('', 0), pd.longest_prefix('/b'))
+        del pd['']
+        self.assertRaises(KeyError, pd.longest_prefix, '/b')
+
+    def test_iter_prefixes(self):
+        pd = PrefixDict([('/a', 1), ('/a/b/', 2), ('/a/b/c', 3), ('/b', 4)])
+        self.assertSequenceEqual(['/a', '/a/b/', '/a/b/c'],
+                                 list(pd.iter_prefixes('/a/b/cd')))
+        self.assertSequenceEqual(['/a'], list(pd.iter_prefixes('/a/')))
+        self.assertSequenceEqual([], list(pd.iter_prefixes('/')))
+
+    def test_fuzzy(self):
+        pd = PrefixDict(cat=0, cart=1, cast=2, dog=3, ca=4)
+        self.assertSequenceEqual([('ca', 1), ('cart', 1), ('cast', 1),
+                                  ('cat', 0)], list(pd.fuzzy('cat', 1)))
+        self.assertSequenceEqual([('cat', 0, 0)],
+                                 list(pd.fuzzy('cat', 0, values=True)))
+        self.assertSequenceEqual([('dog', 3, 3)],
+                                 list(pd.fuzzy('', 3, values=True))[-1:])
+
+    def test_fuzzy_random(self):
+        rand = random.Random(0)
+        keys = set(random_word(rand, 6) for _ in range(200))
+        pd = PrefixDict.fromsorted((key, None) for key in sorted(keys))
+        for _ in range(50):
+            target, limit = random_word(rand, 6), rand.randint(0, 3)
+            expected = [(key, levenshtein(key, target))
+                        for key in sorted(keys)]
+            self.assertSequenceEqual(
+                [pair for pair in expected if pair[1] <= limit],
+                list(pd.fuzzy(target, limit)))
+
+    def test_delete_prefix(self):
+        pd = PrefixDict([('a/1', 0), ('a/2', 1), ('a', 2), ('b/1', 3)])
+        self.assertEqual(2, pd.delete_prefix('a/'))
+        self.assertSequenceEqual(['a', 'b/1'], list(pd))
+        self.assertEqual(2, len(pd))
+        self.assertEqual(0, pd.delete_prefix('c'))
+        self.assertEqual(1, pd.delete_prefix('b'))
+        self.assertEqual(0, len(pd._root[ord('a')]))
+        self.assertEqual(1, pd.delete_prefix(''))
+        self.assertEqual(0, len(pd))
+        pd['a'] = 0
+        self.assertEqual(0, pd['a'])
+
+    def test_pop_prefix(self):
+        pd = PrefixDict([('a/1', 0), ('a/2', 1), ('a', 2), ('b/1', 3)])
+        popped = pd.pop_prefix('a/')
+        self.assertIsInstance(popped, PrefixDict)
+        self.assertSequenceEqual([('a/1', 0), ('a/2', 1)],
+                                 list(popped.items()))
+        self.assertEqual(2, len(popped))
+        self.assertSequenceEqual(['a', 'b/1'], list(pd))
+        popped['a/3'] = 4
+        self.assertNotIn('a/3', pd)
+        self.assertEqual(0, len(pd.pop_prefix('c')))
+        everything = pd.pop_prefix('')
+        self.assertSequenceEqual(['a', 'b/1'], list(everything))
+        self.assertEqual(0, len(pd))
+
+    def test_slice_del_random(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 200, 5)
+        for _ in range(50):
+            pd = PrefixDict.fromsorted((key, key) for key in keys)
+            start, stop = random_word(rand, 3), random_word(rand, 3)
+            inside = list(pd[start:stop])
+            del pd[start:stop]
+            self.assertSequenceEqual(
+                [key for key in keys if key not in inside], list(pd))
+            self.assertEqual(len(keys) - len(inside), len(pd))
+
+    def test_cursor(self):
+        pd = PrefixDict([('a', 0), ('ab', 1), ('abc', 2), ('b', 3)])
+        cursor = pd.cursor()
+        self.assertRaises(ValueError, getattr, cursor, 'key')
+        self.assertFalse(cursor.prev())
+        self.assertTrue(cursor.next())
+        self.assertEqual(('a', 0), (cursor.key, cursor.value))
+        self.assertTrue(cursor.seek('aa'))
+        self.assertEqual('ab', cursor.key)
+        self.assertTrue(cursor.seek('ab', inclusive=False))
+        self.assertEqual('abc', cursor.key)
+        self.assertTrue(cursor.prev())
+        self.assertEqual(('ab', 1), (cursor.key, cursor.value))
+        self.assertFalse(cursor.seek('c'))
+        self.assertTrue(cursor.prev())
+        self.assertEqual('b', cursor.key)
+        self.assertTrue(cursor.last())
+        self.assertFalse(cursor.next())
+        self.assertSequenceEqual(['a', 'ab', 'abc', 'b'], list(pd.cursor()))
+        self.assertFalse(PrefixDict().cursor().first())
+
+    def test_cursor_random(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 200, 5)
+        pd = PrefixDict.fromsorted((key, key) for key in keys)
+        cursor = pd.cursor()
+        for _ in range(200):
+            target, inclusive = random_word(rand, 5), rand.random() < 0.5
+            search = bisect.bisect_left if inclusive else bisect.bisect_right
+            index = search(keys, target)
+            self.assertEqual(index < len(keys),
+                             cursor.seek(target, inclusive))
+            if index == len(keys):
+                continue
+            self.assertEqual(keys[index], cursor.key)
+            if cursor.next():
+                self.assertEqual(keys[index + 1], cursor.key)
+            self.assertTrue(cursor.prev())
+            self.assertEqual(keys[index], cursor.key)
+            self.assertEqual(index > 0, cursor.prev())
+            if index > 0:
+                self.assertEqual(keys[index - 1], cursor.value)
+        cursor.last()
+        found = [cursor.key]
+        while cursor.prev():
+            found.append(cursor.key)
+        self.assertSequenceEqual(keys[::-1], found)
+
+    def test_cursor_position(self):
+        pd = PrefixDict([('a', 0), ('ab', 1), ('b', 2)])
+        cursor = pd.cursor()
+        cursor.seek('ab')
+        position = cursor.position()
+        self.assertEqual('ab', pd.cursor(position).key)
+        del pd['ab']
+        cursor = pd.cursor(position)
+        self.assertRaises(ValueError, getattr, cursor, 'key')
+        self.assertTrue(cursor.next())
+        self.assertEqual('b', cursor.key)
+        cursor = pd.cursor(position)
+        self.assertTrue(cursor.prev())
+        self.assertEqual('a', cursor.key)
+        cursor.next()
+        cursor.next()
+        self.assertFalse(pd.cursor(cursor.position()).next())
+        cursor = pd.cursor(pd.cursor().position())
+        self.assertTrue(cursor.next())
+        self.assertEqual('a', cursor.key)
+        for position in (b'', b'garbage', b'<a', '=a', 1):
+            self.assertRaises(ValueError, pd.cursor, position)
+
+    def test_cursor_iterator(self):
+        pd = PrefixDict([('a', 0), ('b', 1)])
+        cursor = pd.cursor()
+        self.assertSequenceEqual(['a', 'b'], list(cursor))
+        self.assertFalse(hasattr(cursor, '__next__'))
+
+    def test_nearest(self):
+        pd = PrefixDict([('a', 0), ('ab', 1), ('abc', 2), ('b', 3)])
+        self.assertEqual('ab', pd.floor('ab'))
+        self.assertEqual('abc', pd.floor('abd'))
+        self.assertEqual('a', pd.lower('ab'))
+        self.assertEqual(('ab', 1), pd.ceiling('aa', values=True))
+        self.assertEqual('b', pd.higher('abc'))
+        self.assertEqual('a', pd.ceiling(''))
+        self.assertRaises(KeyError, pd.floor, '')
+        self.assertRaises(KeyError, pd.higher, 'b')
+        self.assertEqual('a', pd.min())
+        self.assertEqual(('b', 3), pd.max(values=True))
+        self.assertRaises(ValueError, PrefixDict().min)
+        self.assertRaises(KeyError, PrefixDict().ceiling, 'a')
+
+    def test_nearest_random(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 200, 5)
+        pd = PrefixDict.fromsorted((key, key) for key in keys)
+        for _ in range(200):
+            target = random_word(rand, 6)
+            left = bisect.bisect_left(keys, target)
+            right = bisect.bisect_right(keys, target)
+            for method, index in ((pd.ceiling, left), (pd.higher, right),
+                                  (pd.floor, right - 1),
+                                  (pd.lower, left - 1)):
+                if 0 <= index < len(keys):
+                    self.assertEqual(keys[index], method(target))
+                else:
+                    self.assertRaises(KeyError, method, target)
+
+    def test_list_dir(self):
+        pd = PrefixDict([(key, key) for key in
+                         ('a', 'a/b', 'a/c/d', 'a/c/e', 'a/d', 'a/e/f', 'b/a')])
+        self.assertEqual((['a/b', 'a/d'], ['a/c/', 'a/e/']),
+                         pd.list_dir('a/'))
+        self.assertEqual((['a'], ['a/', 'b/']), pd.list_dir(''))
+        self.assertEqual((['a/b', 'a/c/d', 'a/c/e', 'a/d', 'a/e/f'], []),
+                         pd.list_dir('a/', delimiter=None))
+        self.assertEqual(([], []), pd.list_dir('c'))
+        entries = []
+        start_after = None
+        while True:
+            keys, prefixes = pd.list_dir('a/', limit=2,
+                                         start_after=start_after)
+            if not keys and not prefixes:
+                break
+            entries.extend(keys + prefixes)
+            start_after = max(keys + prefixes)
+        self.assertEqual(['a/b', 'a/c/', 'a/d', 'a/e/'], sorted(entries))
+        self.assertEqual((['a/d'], ['a/e/']),
+                         pd.list_dir('a/', start_after='a/c/d'))
+
+    def test_views(self):
+        pd = PrefixDict([('a', 0), ('ab', 1), ('abc', 2), ('b', 3), ('c', 4)])
+        self.assertSequenceEqual([('a', 0), ('ab', 1), ('abc', 2), ('b', 3),
+                                  ('c', 4)], list(pd.items()))
+        self.assertSequenceEqual([4, 3, 2, 1, 0], list(reversed(pd.values())))
+        self.assertSequenceEqual(['ab', 'abc'], list(pd.keys(prefix='ab')))
+        self.assertSequenceEqual([('ab', 1), ('abc', 2), ('b', 3)],
+                                 list(pd.items(start='ab', stop='b')))
+        self.assertSequenceEqual([3, 2, 1],
+                                 list(reversed(pd.values(start='ab', stop='b'))))
+        self.assertEqual(5, len(pd.items()))
+        self.assertEqual(2, len(pd.values(prefix='ab')))
+        self.assertEqual(2, len(pd.keys(start='b')))
+        self.assertIn(('ab', 1), pd.items(prefix='a'))
+        self.assertNotIn(('ab', 0), pd.items(prefix='a'))
+        self.assertNotIn(('b', 3), pd.items(prefix='a'))
+        self.assertNotIn(1, pd.keys())
+        self.assertIn(2, pd.values(prefix='abc'))
+        self.assertNotIn(3, pd.values(prefix='abc'))
+        self.assertEqual(set(['a', 'ab', 'abc']), pd.keys(stop='abc'))
+        self.assertRaises(ValueError, pd.items, 'a', 'b')
+
+    def test_views_live(self):
+        pd = PrefixDict(a=0)
+        items = pd.items(prefix='a')
+        pd['ab'] = 1
+        pd['b'] = 2
+        self.assertSequenceEqual([('a', 0), ('ab', 1)], list(items))
+        self.assertEqual(2, len(items))
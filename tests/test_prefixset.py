@@ -1,23 +1,14 @@
+import fnmatch
 import itertools
 import operator
 import pickle
+import random
 import string
-
-try:
-    # python 2.x
-    import unittest2 as unittest
-except ImportError:
-    # python 3.x
-    import unittest
-
-try:
-    # python 2.x
-    from itertools import ifilterfalse as filterfalse
-except ImportError:
-    # python 3.x
-    from itertools import filterfalse
+import unittest
+from itertools import filterfalse
 
 from prefixtree import PrefixSet
+from tests import random_word, random_words
 
 
 class TestPrefixSet(unittest.TestCase):
@@ -36,6 +27,14 @@ class TestPrefixSet(unittest.TestCase):
             self.assertFalse(key in pd)
         self.assertEqual(len(pd._root), 0)
 
+    def test_no_values(self):
+        ps = PrefixSet(['a', 'ab'])
+        for _, node in ps._iter(ps._root):
+            self.assertFalse(hasattr(node, 'value'))
+        ps.discard('ab')
+        ps.discard('a')
+        self.assertNotIn('a', ps)
+
     def test_zero_length_key(self):
         self.insert_search_delete([''])
 
@@ -53,6 +52,9 @@ class TestPrefixSet(unittest.TestCase):
     def test_long_key(self):
         self.insert_search_delete([string.printable])
 
+    def test_very_long_key(self):
+        self.insert_search_delete(['ab' * 5000, 'ab' * 4999 + 'b'])
+
     def test_repeated_key(self):
         self.insert_search_delete(['\xFF', '\xFF'])
 
@@ -137,3 +139,121 @@ class TestPrefixSet(unittest.TestCase):
         pd = PrefixSet(['a', 'b', 'c'])
         pd.remove('b')
         list(pd)
+
+    def test_fromsorted(self):
+        keys = [''.join(combo) for combo in itertools.product('abc', repeat=3)]
+        ps = PrefixSet.fromsorted(keys)
+        self.assertIsInstance(ps, PrefixSet)
+        self.assertEqual(len(ps), len(keys))
+        self.assertSequenceEqual(keys, list(ps))
+        self.assertRaises(ValueError, PrefixSet.fromsorted, ['b', 'a'])
+
+    def test_contains_many(self):
+        keys = [''.join(combo) for combo in itertools.product('abc', repeat=3)]
+        ps = PrefixSet(keys[::2])
+        probes = keys[::-1] + ['', 'a', 'aaaa']
+        self.assertSequenceEqual([key in ps for key in probes],
+                                 ps.contains_many(probes))
+
+    def test_longest_prefix(self):
+        ps = PrefixSet(['a', 'abc'])
+        self.assertEqual('abc', ps.longest_prefix('abcd'))
+        self.assertEqual('a', ps.longest_prefix('ab'))
+        self.assertSequenceEqual(['a', 'abc'], list(ps.iter_prefixes('abc')))
+        self.assertRaises(KeyError, ps.longest_prefix, 'b')
+
+    def test_fuzzy(self):
+        ps = PrefixSet(['caf\xe9', 'cafe', 'coffee'])
+        self.assertSequenceEqual([('cafe', 0), ('caf\xe9', 2)],
+                                 list(ps.fuzzy('cafe', 2)))
+
+    def test_match(self):
+        ps = PrefixSet(['user:1:session', 'user:1:name', 'user:22:session',
+                        'user:', 'abc', 'axc', 'ac', 'a[c'])
+        self.assertSequenceEqual(['user:1:session', 'user:22:session'],
+                                 list(ps.match('user:*:session')))
+        self.assertSequenceEqual(['a[c', 'abc', 'axc'], list(ps.match('a?c*')))
+        self.assertSequenceEqual(['abc'], list(ps.match('a[a-b]c')))
+        self.assertSequenceEqual(['a[c', 'axc'], list(ps.match('a[!b]c')))
+        self.assertSequenceEqual(['a[c'], list(ps.match('a[c')))
+        self.assertSequenceEqual(list(ps), list(ps.match('*')))
+        self.assertSequenceEqual([], list(ps.match('')))
+
+    def test_match_random(self):
+        rand = random.Random(0)
+        keys = random_words(rand, 300, 6)
+        ps = PrefixSet(keys)
+        for _ in range(200):
+            pattern = random_word(rand, 4,
+                                  ['a', 'b', '?', '*', '[ab]', '[!a]'])
+            self.assertSequenceEqual(
+                [key for key in keys if fnmatch.fnmatchcase(key, pattern)],
+                list(ps.match(pattern)))
+
+    def test_set_operations(self):
+        rand = random.Random(0)
+        for _ in range(50):
+            first = set(random_word(rand, 5) for _ in range(30))
+            second = set(random_word(rand, 5) for _ in range(30))
+            ps, other = PrefixSet(list(first)), PrefixSet(list(second))
+            for operation in (operator.and_, operator.or_, operator.sub,
+                              operator.xor):
+                result = operation(ps, other)
+                self.assertIsInstance(result, PrefixSet)
+                self.assertSequenceEqual(sorted(operation(first, second)),
+                                         list(result))
+                self.assertEqual(len(operation(first, second)), len(result))
+            self.assertEqual(first.isdisjoint(second), ps.isdisjoint(other))
+            self.assertEqual(first == second, ps == other)
+            self.assertTrue(ps == PrefixSet(sorted(first)))
+
+    def test_set_operations_generic(self):
+        ps = PrefixSet(['a', 'b'])
+        self.assertSequenceEqual(['a', 'b', 'c'], list(ps | set(['c'])))
+        self.assertSequenceEqual(['b'], list(ps - ['a']))
+        self.assertTrue(ps == set(['a', 'b']))
+        self.assertFalse(ps.isdisjoint(['b']))
+
+    def test_cursor(self):
+        ps = PrefixSet(['a', 'ab', 'abc', 'b'])
+        cursor = ps.cursor()
+        self.assertTrue(cursor.seek('aa'))
+        self.assertEqual('ab', cursor.key)
+        self.assertTrue(cursor.next())
+        self.assertEqual('abc', cursor.key)
+        cursor = ps.cursor(cursor.position())
+        self.assertTrue(cursor.prev())
+        self.assertEqual('ab', cursor.key)
+        self.assertSequenceEqual(['a', 'ab', 'abc', 'b'], list(ps.cursor()))
+
+    def test_nearest(self):
+        ps = PrefixSet(['a', 'ab', 'abc', 'b'])
+        self.assertEqual('abc', ps.floor('abd'))
+        self.assertEqual('ab', ps.ceiling('aa'))
+        self.assertEqual('a', ps.lower('ab'))
+        self.assertEqual('b', ps.higher('abc'))
+        self.assertEqual(('a', 'b'), (ps.min(), ps.max()))
+        self.assertRaises(KeyError, ps.lower, 'a')
+
+    def test_list_dir(self):
+        ps = PrefixSet(['x/1', 'x/2/a', 'x/2/b', 'x/3::a', 'y'])
+        self.assertEqual((['x/1', 'x/3::a'], ['x/2/']), ps.list_dir('x/'))
+        self.assertEqual((['x/1', 'x/2/a', 'x/2/b'], ['x/3::']),
+                         ps.list_dir('x', delimiter='::'))
+        self.assertEqual(([], ['x/2/']), ps.list_dir('x/', limit=1,
+                                                     start_after='x/1'))
+
+    def test_inplace_operations(self):
+        ps = PrefixSet(['a', 'ab', 'b'])
+        ps |= PrefixSet(['abc', 'c'])
+        self.assertSequenceEqual(['a', 'ab', 'abc', 'b', 'c'], list(ps))
+        ps &= PrefixSet(['ab', 'abc', 'b', 'd'])
+        self.assertSequenceEqual(['ab', 'abc', 'b'], list(ps))
+        ps -= PrefixSet(['abc'])
+        self.assertSequenceEqual(['ab', 'b'], list(ps))
+        ps ^= PrefixSet(['b', 'c'])
+        self.assertSequenceEqual(['ab', 'c'], list(ps))
+        self.assertEqual(2, len(ps))
+        ps -= ps
+        self.assertEqual(0, len(ps))
+        self.assertEqual(0, len(ps._root))
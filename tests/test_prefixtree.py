@@ -1,11 +1,5 @@
 import doctest
-
-try:
-    # python 2.x
-    import unittest2 as unittest
-except ImportError:
-    # python 3.x
-    import unittest
+import unittest
 
 import prefixtree
 
@@ -15,10 +9,7 @@ PEP386 = r"""^(?P<version>\d+\.\d+)(?P<extraversion>(?:\.\d+)*)(?:(?P<prerel>[ab
 class TestPrefixTree(unittest.TestCase):
 
     def test_valid_version(self):
-        if hasattr(self, 'assertRegex'):
-            self.assertRegex(prefixtree.__version__, PEP386)
-        else:
-            self.assertRegexpMatches(prefixtree.__version__, PEP386)
+        self.assertRegex(prefixtree.__version__, PEP386)
 
     def test_readme(self):
         doctest.testfile('../README.rst')
@@ -1,11 +1,5 @@
 import itertools
-
-try:
-    # python 2.x
-    import unittest2 as unittest
-except ImportError:
-    # python 3.x
-    import unittest
+import unittest
 
 from prefixtree import PrefixDict
 
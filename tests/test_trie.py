@@ -1,11 +1,4 @@
-import sys
-
-try:
-    # python 2.x
-    import unittest2 as unittest
-except ImportError:
-    # python 3.x
-    import unittest
+import unittest
 
 from prefixtree import trie
 
@@ -50,17 +43,103 @@ class TestNode(unittest.TestCase):
             n[k] = v
         self.assertEqual(len(n), 128)
 
-    def test_set_path(self):
-        n = trie.Node('a')
-        self.assertEqual(n.path, 'a')
+    def test_reversed(self):
+        keys = [(k, Ellipsis) for k in range(128, 256)]
+        n = trie.Node()
+        for k, v in keys:
+            n[k] = v
+        self.assertSequenceEqual(list(reversed(n)), list(reversed(keys)))
 
-    def test_path_readonly(self):
+    def test_every_byte(self):
+        n = trie.Node()
+        for k in range(256):
+            n[k] = k
+        self.assertEqual(len(n), 256)
+        for k in range(256):
+            self.assertIn(k, n)
+            self.assertEqual(n[k], k)
+
+    def test_layout_upgrade(self):
+        n = trie.Node()
+        for k in range(trie.SPARSE_CHILDREN):
+            n[k] = k
+        self.assertIs(type(n), trie.Node)
+        n[255] = 255
+        self.assertIs(type(n), trie.IndexedNode)
+        for k in range(trie.SPARSE_CHILDREN, trie.INDEXED_CHILDREN):
+            n[k] = k
+        self.assertIs(type(n), trie.DenseNode)
+        self.assertEqual(n[255], 255)
+
+    def test_layout_downgrade(self):
+        keys = list(range(0, 256, 2))
+        n = trie.Node()
+        for k in keys:
+            n[k] = k
+        self.assertIs(type(n), trie.DenseNode)
+        while keys:
+            del n[keys.pop(0)]
+            self.assertSequenceEqual([k for k, _ in n], keys)
+            self.assertSequenceEqual([v for _, v in n], keys)
+        self.assertIs(type(n), trie.Node)
+        self.assertEqual(len(n), 0)
+
+    def test_range(self):
+        for size in (4, trie.SPARSE_CHILDREN + 1, trie.INDEXED_CHILDREN + 1):
+            n = trie.Node()
+            for k in range(0, size * 2, 2):
+                n[k] = k
+            expected = [(k, k) for k in range(0, size * 2, 2) if 3 <= k <= 7]
+            self.assertSequenceEqual(list(n._range(3, 7)), expected)
+            self.assertSequenceEqual(list(n._range(3, 7, reverse=True)),
+                                     expected[::-1])
+
+    def test_del_missing(self):
+        for size in (1, trie.SPARSE_CHILDREN + 1, trie.INDEXED_CHILDREN + 1):
+            n = trie.Node()
+            for k in range(size):
+                n[k] = k
+            del n[255]
+            self.assertEqual(len(n), size)
+
+    def test_compact(self):
+        layouts = ((4, trie.Node),
+                   (trie.SPARSE_CHILDREN + 1, trie.IndexedNode),
+                   (trie.INDEXED_CHILDREN + 1, trie.DenseNode))
+        for size, layout in layouts:
+            n = trie.Node()
+            for k in range(256):
+                n[k] = k
+            for k in range(size, 256):
+                del n[k]
+            n._compact()
+            self.assertIs(type(n), layout)
+            self.assertSequenceEqual(list(n), [(k, k) for k in range(size)])
+
+    def test_stats_layouts(self):
+        n = trie.StatsNode()
+        n._count = 3
+        layouts = []
+        for k in range(256):
+            n[k] = k
+            layouts.append(type(n))
+        for k in range(256):
+            del n[k]
+            layouts.append(type(n))
+        self.assertEqual(set([trie.StatsNode, trie.StatsIndexedNode,
+                              trie.StatsDenseNode]), set(layouts))
+        self.assertEqual(3, n._count)
+        self.assertFalse(hasattr(trie.Node(), '_count'))
+
+    def test_set_edge(self):
+        n = trie.Node(b'a')
+        self.assertEqual(n._edge, b'a')
+
+    def test_no_path(self):
         with self.assertRaises(AttributeError):
             n = trie.Node()
-            n.path = 'a'
+            n.path = b'a'
 
-    @unittest.skipIf(sys.version_info[:2] < (3, 3),
-            "slots unsupported before Py 3.3")
     def test_slots(self):
         with self.assertRaises(AttributeError):
             n = trie.Node()
@@ -73,13 +152,13 @@ class TestTrie(unittest.TestCase):
         t = trie.TrieBase()
         path, encoded = t.prepare_key(b'ab')
         self.assertFalse(encoded)
-        self.assertSequenceEqual(list(trie.iord(path)), [97, 98])
+        self.assertSequenceEqual(list(path), [97, 98])
 
     def test_unicode_path(self):
         t = trie.TrieBase()
         path, encoded = t.prepare_key(b'ab'.decode('UTF-8'))
         self.assertTrue(encoded)
-        self.assertSequenceEqual(list(trie.iord(path)), [97, 98])
+        self.assertSequenceEqual(list(path), [97, 98])
 
     def test_invalid_path(self):
         t = trie.TrieBase()
@@ -92,3 +171,31 @@ class TestTrie(unittest.TestCase):
     def test_restore_unicode(self):
         t = trie.TrieBase()
         self.assertEqual(b'ab'.decode('UTF-8'), t.restore_key(b'ab', True))
+
+    def test_search_layouts(self):
+        sizes = (1, 4, trie.SPARSE_CHILDREN + 1, trie.INDEXED_CHILDREN + 1)
+        for size in sizes:
+            t = trie.TrieBase()
+            for byte in range(0, 2 * size, 2):
+                leaf = t._insert(bytes([byte, 7]), t._root)
+                leaf.meta = False
+            for byte in range(2 * size + 1):
+                path = bytes([byte, 7])
+                if byte % 2 or byte == 2 * size:
+                    self.assertRaises(AttributeError, t._search, path,
+                                      t._root)
+                    self.assertEqual(0, t._match(path, t._root)[1])
+                else:
+                    self.assertIs(t._insert(path, t._root),
+                                  t._search(path, t._root))
+                    self.assertEqual(2, t._match(path, t._root)[1])
+                self.assertRaises(AttributeError, t._search, bytes([byte, 8]),
+                                  t._root)
+
+    def test_iter_paths(self):
+        t = trie.TrieBase()
+        for key in (b'ab', b'abcd', b'b'):
+            leaf = t._insert(key, t._root)
+            leaf.value, leaf.meta = None, False
+        paths = [bytes(path) for path, _ in t._iter(t._root)]
+        self.assertSequenceEqual(paths, [b'', b'a', b'ab', b'abc', b'abcd', b'b'])
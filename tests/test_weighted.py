@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from prefixtree import PrefixDict
+from tests import random_word
+
+
+class WeightedDict(PrefixDict):
+
+    weighted = True
+
+
+class CompressedWeightedDict(PrefixDict):
+
+    compressed = True
+
+    weighted = True
+
+
+def brute_force(pd, prefix, k):
+    items = [(key, pd[key]) for key in pd.startswith(prefix)]
+    return sorted(items, key=lambda item: -item[1])[:k]
+
+
+class TestWeightedDict(unittest.TestCase):
+
+    def test_top_k(self):
+        wd = WeightedDict(car=5, cart=9, cat=7, dog=8, do=1)
+        self.assertSequenceEqual([('cart', 9), ('cat', 7)], wd.top_k('ca', 2))
+        self.assertSequenceEqual([('dog', 8), ('do', 1)], wd.top_k('d', 5))
+        self.assertSequenceEqual([], wd.top_k('x', 5))
+        self.assertEqual(9, wd._root._best)
+        wd['cart'] = 0
+        self.assertSequenceEqual([('dog', 8), ('cat', 7)], wd.top_k('', 2))
+        del wd['dog']
+        self.assertEqual(7, wd._root._best)
+        self.assertSequenceEqual([('do', 1)], wd.top_k('do', 2))
+
+    def test_ties(self):
+        wd = WeightedDict(b=1, a=1, ab=1, c=0)
+        self.assertSequenceEqual([('a', 1), ('ab', 1), ('b', 1)],
+                                 wd.top_k('', 3))
+
+    def test_unweighted(self):
+        pd = PrefixDict(car=5, cart=9, cat=7)
+        self.assertSequenceEqual([('cart', 9), ('cat', 7)], pd.top_k('ca', 2))
+
+    def test_slices(self):
+        wd = WeightedDict(a=1, b=2, c=3)
+        wd['b':'c'] = [4, 0]
+        self.assertSequenceEqual([('b', 4), ('a', 1)], wd.top_k('', 2))
+        del wd['b':'c']
+        self.assertSequenceEqual([('a', 1)], wd.top_k('', 2))
+
+    def test_slice_best(self):
+        for cls in (WeightedDict, CompressedWeightedDict):
+            wd = cls(car=5, cart=9, cat=7, dog=8, do=1)
+            wd['cart':'cb'] = [2, 6]
+            self.assertSequenceEqual([('dog', 8), ('cat', 6)],
+                                     wd.top_k('', 2))
+            self.assertEqual(8, wd._root._best)
+            self.assertEqual(6, wd._root[ord('c')]._best)
+            wd['d':] = [0, 3]
+            self.assertEqual(6, wd._root._best)
+            self.assertEqual(3, wd._root[ord('d')]._best)
+            self.assertSequenceEqual([('cat', 6), ('car', 5), ('dog', 3)],
+                                     wd.top_k('', 3))
+
+    def test_delete_prefix(self):
+        wd = WeightedDict(car=5, cart=9, cat=7, dog=8)
+        wd.delete_prefix('car')
+        self.assertSequenceEqual([('dog', 8), ('cat', 7)], wd.top_k('', 3))
+        popped = wd.pop_prefix('d')
+        self.assertSequenceEqual([('dog', 8)], popped.top_k('', 3))
+        self.assertSequenceEqual([('cat', 7)], wd.top_k('', 3))
+        wd['cow'] = 1
+        del wd['c':'cat']
+        self.assertSequenceEqual([('cow', 1)], wd.top_k('', 3))
+
+    def test_fromsorted(self):
+        wd = WeightedDict.fromsorted([('a', 3), ('ab', 1), ('b', 2)])
+        self.assertSequenceEqual([('a', 3), ('b', 2)], wd.top_k('', 2))
+
+    def test_random(self):
+        rand = random.Random(0)
+        for cls in (WeightedDict, CompressedWeightedDict):
+            wd = cls()
+            for _ in range(2000):
+                key = random_word(rand, 6)
+                if key in wd and rand.random() < 0.4:
+                    del wd[key]
+                else:
+                    wd[key] = rand.randint(0, 100)
+                if rand.random() < 0.1:
+                    prefix, k = random_word(rand, 3), rand.randint(1, 5)
+                    self.assertSequenceEqual(
+                        [value for _, value in brute_force(wd, prefix, k)],
+                        [value for _, value in wd.top_k(prefix, k)])
+            wd.compact()
+            for prefix in ('', 'a', 'ab', 'abc'):
+                self.assertSequenceEqual(brute_force(wd, prefix, 10)[:1],
+                                         wd.top_k(prefix, 1))